@@ -1,12 +1,20 @@
-import requests
-import filecmp
-import shutil
+import argparse
+import json
+import subprocess
 import os
 
-MOZILLA_CENTRAL_URL = "https://hg.mozilla.org/mozilla-central/raw-file/tip/"
-GITHUB_ACTIONS_PATH = "./firefox-ios/Client/Assets/CC_Script/"
-GITHUB_ACTIONS_TMP_PATH = f"{GITHUB_ACTIONS_PATH}tmp/"
+# Shared with the other vendoring scripts, run with PYTHONPATH=test-fixtures/ci
+from vendored_sync import MISSING, UNCHANGED, ConditionalCache, Source, SyncError, atomic_write, create_session, sync
 
+MOZILLA_CENTRAL_REPO_URL = "https://hg.mozilla.org/mozilla-central/"
+MOZILLA_CENTRAL_URL = MOZILLA_CENTRAL_REPO_URL + "raw-file/{revision}/"
+GITHUB_ACTIONS_PATH = "./firefox-ios/Client/Assets/CC_Script/"
+# Records the mozilla-central revision the files were last updated from, and their SHA-256
+MANIFEST_PATH = f"{GITHUB_ACTIONS_PATH}manifest.json"
+# The last revision checked, kept in the VENDORED_SYNC_CACHE of the job rather than in
+# the manifest, so that a check finding nothing leaves the tree alone
+CHECKED_REVISION_KEY = "CC_Script checked revision"
+MAX_WORKERS = 8
 
 FILES_TO_DOWNLOAD = [
     "browser/extensions/formautofill/content/addressFormLayout.mjs",
@@ -43,97 +51,153 @@ FILES_TO_DOWNLOAD = [
 ]
 
 
-# Methods related to file download, compare, copy contents and removal
+# Methods related to file download
 
-def downloadTemporaryFileToCompare(file_info):
-    reqHeader = {"Cache-Control": "no-cache", "Pragma": "no-cache"}
-    try:
-        response = requests.get(file_info["url"], stream=True, headers=reqHeader)
-        if response.status_code != 200:
-            print(f"Failed to download file: {file_info['url']}. Response status code: {response.status_code}")
-            return False
-        try:
-            with open(file_info["tmp_path"], "wb") as f:
-                for chunk in response.iter_content():
-                    f.write(chunk)
-            return True
-        except:
-            print("Could not write to the file")
-    except requests.exceptions.HTTPError as err:
-        raise SystemExit(err)
+def createSession():
+    session = create_session(pool_size=MAX_WORKERS)
+    session.headers.update({"Cache-Control": "no-cache", "Pragma": "no-cache"})
+    return session
 
-def compare_file(file1, file2):
-    result = filecmp.cmp(file1, file2)
-    print("comparing two files -> ?", result)
-    return result
-
-def copyContents(fromFile, toFile):
-    print("copying contents")
-    with open(fromFile, "rb") as f2, open(toFile, "wb") as f1:
-        shutil.copyfileobj(f2, f1)
-
-def removeFile(fileToRemove):
-    if os.path.exists(fileToRemove):
-        os.remove(fileToRemove)
-        return True
-    else:
-        print("Nothing to remove, all clear")
-        return False
-
-def getFileInfo(path):
+def getFileInfo(path, revision="tip"):
     filename = os.path.basename(path)
     return {
+        "source": path,
         "filename": filename,
-        "url": MOZILLA_CENTRAL_URL + path,
+        "url": MOZILLA_CENTRAL_URL.format(revision=revision) + path,
         "path": GITHUB_ACTIONS_PATH + filename,
-        "tmp_path": GITHUB_ACTIONS_TMP_PATH + filename,
     }
 
-def removeTmpFiles():
-    for file in FILES_TO_DOWNLOAD:
-        removeFile(GITHUB_ACTIONS_TMP_PATH + file)
+# Methods related to the manifest and upstream revisions
 
-def createTmpDirectory():
-    if os.path.exists(GITHUB_ACTIONS_TMP_PATH) == False:
-        os.mkdir(GITHUB_ACTIONS_TMP_PATH)
+def readManifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {"revision": None, "files": {}}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
 
-def removeTmpDirectory():
-    if os.path.exists(GITHUB_ACTIONS_TMP_PATH):
-        os.rmdir(GITHUB_ACTIONS_TMP_PATH)
+def writeManifest(manifest):
+    atomic_write(MANIFEST_PATH, (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode("utf-8"))
 
-# main
-def main():
-    # create tmp directory
-    createTmpDirectory()
+def getTipRevision(session):
+    response = session.get(MOZILLA_CENTRAL_REPO_URL + "json-rev/tip")
+    response.raise_for_status()
+    return response.json()["node"]
 
-    for file in FILES_TO_DOWNLOAD:
-        file_info = getFileInfo(file)
-        # download file to compare changes
-        downloaded = downloadTemporaryFileToCompare(file_info)
+def getChangedFiles(session, from_revision, to_revision, local_repo=None):
+    """Returns the set of files touched between the two revisions, or None if it can't be determined.
 
+    Uses a local mozilla-central clone when one is given, the pushlog of hg.mozilla.org otherwise.
+    """
+    if local_repo:
+        try:
+            output = subprocess.check_output(
+                ["hg", "status", "--no-status", "--rev", from_revision, "--rev", to_revision],
+                cwd=local_repo,
+            )
+        except (OSError, subprocess.CalledProcessError) as err:
+            print(f"Could not read changes from {local_repo}: {err}")
+            return None
+        return set(output.decode("utf-8").splitlines())
+
+    response = session.get(
+        MOZILLA_CENTRAL_REPO_URL + "json-pushes",
+        params={"version": 2, "full": 1, "fromchange": from_revision, "tochange": to_revision},
+    )
+    if response.status_code != 200:
+        print(f"Could not read the pushlog from {from_revision} to {to_revision}. Response status code: {response.status_code}")
+        return None
+
+    changed_files = set()
+    for push in response.json()["pushes"].values():
+        for changeset in push["changesets"]:
+            changed_files.update(changeset["files"])
+    return changed_files
+
+def getFilesToUpdate(manifest, changed_files):
+    files = []
+    for file in FILES_TO_DOWNLOAD:
+        if (
+            changed_files is None
+            or file in changed_files
+            or file not in manifest["files"]
+            or not os.path.exists(getFileInfo(file)["path"])
+        ):
+            files.append(file)
+    return files
+
+def downloadFiles(session, files_info):
+    # Every file is downloaded and compared in memory before any of them is written,
+    # so a failed download never leaves a half-updated set of assets
+    sources = [
         # This can happen if the file was removed and doesn't exist anymore on central
         # We don't want to fail if that's the case
-        if not downloaded:
+        Source(file_info["filename"], file_info["url"], file_info["path"], missing_ok=True)
+        for file_info in files_info
+    ]
+    try:
+        return sync(sources, session=session, max_workers=MAX_WORKERS)
+    except SyncError as err:
+        raise SystemExit(err)
+
+# main
+def main():
+    parser = argparse.ArgumentParser(description="Updates the CC_Script files vendored from mozilla-central.")
+    parser.add_argument("--local-repo", help="mozilla-central clone used to list changed files instead of the pushlog")
+    parser.add_argument("--force", action="store_true", help="download every file, even if it did not change upstream")
+    args = parser.parse_args()
+
+    manifest = readManifest()
+    # Drop the files that aren't vendored anymore
+    manifest["files"] = {file: sha for file, sha in manifest["files"].items() if file in FILES_TO_DOWNLOAD}
+
+    cache = ConditionalCache.from_env()
+    with createSession() as session:
+        tip_revision = getTipRevision(session)
+        # Upstream pushes were already looked at up to the last checked revision,
+        # even if none of them touched the vendored files
+        checked_revision = cache.get(CHECKED_REVISION_KEY) or manifest["revision"]
+
+        changed_files = None
+        if checked_revision and not args.force:
+            if checked_revision == tip_revision:
+                changed_files = set()
+            else:
+                changed_files = getChangedFiles(session, checked_revision, tip_revision, args.local_repo)
+
+        files_to_update = getFilesToUpdate(manifest, changed_files)
+        if not files_to_update:
+            print(f"No vendored file changed between {checked_revision} and {tip_revision}, do nothing")
+            saveCheckedRevision(cache, tip_revision)
+            return
+
+        print(f"Updating {len(files_to_update)} file(s) to revision {tip_revision}")
+
+        files_info = [getFileInfo(file, tip_revision) for file in files_to_update]
+        results = downloadFiles(session, files_info)
+
+    updated = False
+    for file_info, result in zip(files_info, results):
+        if result.status == MISSING:
             print(f"Skipping file: {file_info['filename']}")
             continue
 
-        # move file if it does not exist
-        if os.path.exists(file_info["path"]) == False:
-            shutil.move(file_info["tmp_path"], file_info["path"])
+        manifest["files"][file_info["source"]] = result.sha256
+        if result.status == UNCHANGED:
+            print(f"No change for {file_info['filename']}, do nothing")
         else:
-            # compare if there are any changes with the file
-            # downloaded vs what we currently have on disk
-            compare_file_result = compare_file(file_info["tmp_path"], file_info["path"])
-            if compare_file_result == False:
-                copyContents(file_info["tmp_path"], file_info["path"])
-            else:
-                print("No change, do nothing")
+            print(f"Updated {file_info['filename']}")
+            updated = True
 
-        # remove temp downloaded file for cleanup
-        removeFile(file_info["tmp_path"])
+    # The manifest only changes along with the files, so that upstream pushes touching
+    # none of them don't turn into a manifest-only pull request
+    if updated or manifest["files"] != readManifest()["files"]:
+        manifest["revision"] = tip_revision
+        writeManifest(manifest)
+    saveCheckedRevision(cache, tip_revision)
 
-    # cleanup tmp directory
-    removeTmpDirectory()
+def saveCheckedRevision(cache, revision):
+    cache.set(CHECKED_REVISION_KEY, revision)
+    cache.save()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
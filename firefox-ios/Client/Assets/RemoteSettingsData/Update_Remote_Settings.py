@@ -1,40 +1,263 @@
-import requests
-import filecmp
-import shutil
+import base64
 import os
 import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# From test-fixtures/ci, which the workflow puts on PYTHONPATH
+from vendored_sync import atomic_write, content_hash, create_session
 
 CONFIG_FILE = "./firefox-ios/Client/Assets/RemoteSettingsData/RemoteSettingsFetchConfig.json"
 GITHUB_ACTIONS_PATH = "./firefox-ios/Client/Assets/RemoteSettingsData/"
 GITHUB_ACTIONS_TMP_PATH = f"{GITHUB_ACTIONS_PATH}tmp/"
+MAX_WORKERS = 8
+CHUNK_SIZE = 64 * 1024
+# Defaults for the optional "max_bytes" and "min_records" settings of each rule
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_MIN_RECORDS = 1
+CONTENT_SIGNATURE_PREFIX = b"Content-Signature:\x00"
 
-def fetch_rules(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()["data"]
-    else:
-        print(f"Failed to fetch rules from {url}: {response.status_code}")
+class ValidationError(Exception):
+    pass
+
+def parse_collection_url(url):
+    # e.g. https://firefox.settings.services.mozilla.com/v1/buckets/main/collections/password-rules/records
+    server, _, path = url.partition("/buckets/")
+    parts = path.split("/")
+    if not server or len(parts) < 3 or parts[1] != "collections":
         return None
+    return {"server": server, "bucket": parts[0], "collection": parts[2]}
+
+def meta_file_path(file_path):
+    # The collection timestamp is stored next to each JSON file, e.g. RemotePasswordRules.meta.json
+    return os.path.splitext(file_path)[0] + ".meta.json"
+
+def read_meta(file_path):
+    meta_path = meta_file_path(file_path)
+    if not os.path.exists(file_path) or not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, 'r') as meta_file:
+        return json.load(meta_file)
+
+def read_timestamp(file_path):
+    return read_meta(file_path).get("timestamp")
+
+def write_meta(file_path, meta):
+    atomic_write(meta_file_path(file_path), (json.dumps(meta, indent=4, sort_keys=True) + "\n").encode("utf-8"))
+
+def read_local_rules(file_path):
+    with open(file_path, 'r') as local_file:
+        rules = json.load(local_file)
+    # Older snapshots wrap the records in the API response envelope
+    return rules["data"] if isinstance(rules, dict) else rules
+
+def fetch_json(session, url, params=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Downloads a JSON document, refusing truncated responses and responses over `max_bytes`.
+
+    The body is read in chunks so that an oversized response is dropped as soon as it goes over
+    `max_bytes`, then parsed once.
+    """
+    with session.get(url, params=params, stream=True) as response:
+        if response.status_code != 200:
+            print(f"Failed to fetch {url}: {response.status_code}")
+            return None
+
+        content_length = response.headers.get("Content-Length")
+        if content_length is not None and int(content_length) > max_bytes:
+            raise ValidationError(f"{url} is {content_length} bytes, more than the {max_bytes} allowed")
 
-def save_tmp_rules(rules, tmp_file_path):
-    with open(tmp_file_path, 'w') as tmp_file:
-        json.dump(rules, tmp_file, indent=4)
-    print(f"Saved temporary rules to {tmp_file_path}")
-
-def update_settings_file(tmp_file_path, target_file_path, name):
-    if os.path.exists(target_file_path):
-        if filecmp.cmp(tmp_file_path, target_file_path):
-            print(f"No changes detected for {name}.")
-            os.remove(tmp_file_path)
-            return False
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if len(body) + len(chunk) > max_bytes:
+                raise ValidationError(f"{url} is more than the {max_bytes} bytes allowed")
+            body += chunk
+
+    # requests transparently decompresses the body, so only compare lengths when it was sent as is
+    if content_length is not None and "Content-Encoding" not in response.headers and len(body) != int(content_length):
+        raise ValidationError(f"{url} was truncated: got {len(body)} of {content_length} bytes")
+
+    try:
+        return json.loads(body)
+    except ValueError as err:
+        raise ValidationError(f"{url} is not valid JSON: {err}")
+
+def fetch_rules(session, url, max_bytes=DEFAULT_MAX_BYTES):
+    response = fetch_json(session, url, max_bytes=max_bytes)
+    return response["data"] if response is not None else None
+
+def fetch_collection_timestamps(session, server):
+    """Returns the current timestamp of every collection on the server, in a single request."""
+    url = f"{server}/buckets/monitor/collections/changes/changeset"
+    response = session.get(url, params={"_expected": 0})
+    if response.status_code != 200:
+        print(f"Failed to fetch collection timestamps from {url}: {response.status_code}")
+        return {}
+    return {
+        (change["bucket"], change["collection"]): change["last_modified"]
+        for change in response.json()["changes"]
+    }
+
+def fetch_changes(session, collection, since, expected, max_bytes=DEFAULT_MAX_BYTES):
+    url = "{server}/buckets/{bucket}/collections/{collection}/changeset".format(**collection)
+    params = {"_expected": expected}
+    if since is not None:
+        params["_since"] = f'"{since}"'
+    return fetch_json(session, url, params=params, max_bytes=max_bytes)
+
+def merge_changes(rules, changes):
+    records = {record["id"]: record for record in rules}
+    for change in changes:
+        if change.get("deleted"):
+            records.pop(change["id"], None)
         else:
-            os.replace(tmp_file_path, target_file_path)
-            print(f"Updated {target_file_path} with new rules for {name}.")
-            return True
-    else:
-        os.replace(tmp_file_path, target_file_path)
-        print(f"Created new rules file {target_file_path} for {name}.")
-        return True
+            records[change["id"]] = change
+    return list(records.values())
+
+def fetch_rule(session, rule, timestamps):
+    """Fetches the records of a collection, only pulling the changes since the stored timestamp.
+
+    Returns a tuple of the records, the collection timestamp and the collection metadata. The
+    records are None when the collection didn't change or couldn't be fetched.
+    """
+    max_bytes = rule.get("max_bytes", DEFAULT_MAX_BYTES)
+    collection = parse_collection_url(rule["url"])
+    if collection is None:
+        # Not a collection URL we know how to query for changes, fetch it whole.
+        return fetch_rules(session, rule["url"], max_bytes), None, None
+
+    since = read_timestamp(rule["file"])
+    expected = timestamps.get((collection["bucket"], collection["collection"]))
+    if expected is not None and since == expected:
+        print(f"{rule['name']} is up to date (timestamp {since}).")
+        return None, since, None
+
+    changeset = fetch_changes(session, collection, since, expected if expected is not None else 0, max_bytes)
+    if changeset is None:
+        return None, None, None
+
+    changes = changeset["changes"]
+    print(f"Fetched {len(changes)} changed record(s) for {rule['name']} since {since}.")
+    rules = read_local_rules(rule["file"]) if since is not None else []
+    return merge_changes(rules, changes), changeset["timestamp"], changeset.get("metadata")
+
+def fetch_all_rules(session, rules_config):
+    servers = {collection["server"] for collection in map(parse_collection_url, (rule["url"] for rule in rules_config)) if collection}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        timestamps = {}
+        for server_timestamps in executor.map(lambda server: fetch_collection_timestamps(session, server), servers):
+            timestamps.update(server_timestamps)
+        return list(executor.map(lambda rule: fetch_rule(session, rule, timestamps), rules_config))
+
+def serialize_rules(rules):
+    """Serializes records canonically: sorted by id, with sorted keys.
+
+    The order the server returns records in doesn't matter, so it must not show up as a change.
+    """
+    records = sorted(rules, key=lambda record: record.get("id", ""))
+    return (json.dumps(records, indent=4, sort_keys=True, ensure_ascii=False) + "\n").encode("utf-8")
+
+def current_hash(target_file_path):
+    # The hash of the last snapshot is stored in the meta file, so the snapshot itself
+    # is only read and canonicalized when it was written by something else.
+    meta = read_meta(target_file_path)
+    if "sha256" in meta:
+        return meta["sha256"]
+    if not os.path.exists(target_file_path):
+        return None
+    return content_hash(serialize_rules(read_local_rules(target_file_path)))
+
+def validate_rules(rule, rules):
+    """Checks the record count and that every record has the fields the app relies on."""
+    min_records = rule.get("min_records", DEFAULT_MIN_RECORDS)
+    if len(rules) < min_records:
+        raise ValidationError(f"{rule['name']} has {len(rules)} record(s), expected at least {min_records}")
+
+    required_fields = ["id", "last_modified"] + rule.get("required_fields", [])
+    for record in rules:
+        missing = [field for field in required_fields if field not in record]
+        if missing:
+            raise ValidationError(f"{rule['name']} record {record.get('id')} is missing {', '.join(missing)}")
+
+def canonical_json(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def verify_signature(rule, rules, timestamp, metadata):
+    """Verifies the content signature of the collection with the certificate chain stored at
+    rule["certificate_chain"]: leaf first, each certificate issued by the next one.
+
+    Needs the `cryptography` package, which is only imported when a rule asks for this.
+    """
+    from cryptography import x509
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+    signature = (metadata or {}).get("signature")
+    if not signature or timestamp is None:
+        raise ValidationError(f"{rule['name']} has no signature to verify")
+
+    with open(rule["certificate_chain"], "rb") as chain_file:
+        chain = x509.load_pem_x509_certificates(chain_file.read())
+    try:
+        for certificate, issuer in zip(chain, chain[1:]):
+            certificate.verify_directly_issued_by(issuer)
+    except (ValueError, TypeError, InvalidSignature) as err:
+        raise ValidationError(f"Invalid certificate chain {rule['certificate_chain']}: {err}")
+
+    # The signature covers the whole collection, sorted by id, and its timestamp
+    payload = {"data": sorted(rules, key=lambda record: record["id"]), "last_modified": str(timestamp)}
+    raw_signature = base64.urlsafe_b64decode(signature["signature"] + "=" * (-len(signature["signature"]) % 4))
+    half = len(raw_signature) // 2
+    der_signature = encode_dss_signature(
+        int.from_bytes(raw_signature[:half], "big"), int.from_bytes(raw_signature[half:], "big")
+    )
+    try:
+        chain[0].public_key().verify(
+            der_signature,
+            CONTENT_SIGNATURE_PREFIX + canonical_json(payload).encode("utf-8"),
+            ec.ECDSA(hashes.SHA384()),
+        )
+    except InvalidSignature:
+        raise ValidationError(f"Invalid signature for {rule['name']}")
+
+def prepare_settings_file(rules, target_file_path, name, timestamp=None):
+    """Writes the snapshot to the tmp directory if its content changed.
+
+    Returns the tmp path, or None when only the meta is missing, and the meta to record. Returns
+    None when the content didn't change.
+    """
+    content = serialize_rules(rules)
+    meta = {"timestamp": timestamp, "sha256": content_hash(content)}
+    # The meta is tracked along with the snapshot, so a newer timestamp alone doesn't get written:
+    # the next run fetches the changes since the recorded one again, which is cheaper than a
+    # pull request for it.
+    if meta["sha256"] == read_meta(target_file_path).get("sha256"):
+        print(f"No changes detected for {name}.")
+        return None
+    if meta["sha256"] == current_hash(target_file_path):
+        # A snapshot committed without its meta, e.g. by hand
+        print(f"No changes detected for {name}, recording its meta.")
+        return None, meta
+
+    tmp_file_path = os.path.join(GITHUB_ACTIONS_TMP_PATH, os.path.basename(target_file_path))
+    with open(tmp_file_path, 'wb') as tmp_file:
+        tmp_file.write(content)
+    return tmp_file_path, meta
+
+def commit_settings_files(updates):
+    """Moves every prepared snapshot into place, once all of them were fetched and validated."""
+    for rule, tmp_file_path, meta in updates:
+        if tmp_file_path is None:
+            write_meta(rule["file"], meta)
+            continue
+        existed = os.path.exists(rule["file"])
+        os.replace(tmp_file_path, rule["file"])
+        write_meta(rule["file"], meta)
+        if existed:
+            print(f"Updated {rule['file']} with new rules for {rule['name']}.")
+        else:
+            print(f"Created new rules file {rule['file']} for {rule['name']}.")
 
 def main():
     if not os.path.exists(GITHUB_ACTIONS_TMP_PATH):
@@ -42,19 +265,30 @@ def main():
     
     with open(CONFIG_FILE, 'r') as config_file:
         config = json.load(config_file)
+
+    print(f"Fetching rules for {', '.join(rule['name'] for rule in config['rules'])}")
+    try:
+        with create_session(pool_size=MAX_WORKERS) as session:
+            results = fetch_all_rules(session, config["rules"])
+
+        updates = []
+        for rule, (rules, timestamp, metadata) in zip(config["rules"], results):
+            if rules is None:
+                continue
+            validate_rules(rule, rules)
+            if rule.get("certificate_chain"):
+                verify_signature(rule, rules, timestamp, metadata)
+            prepared = prepare_settings_file(rules, rule["file"], rule["name"], timestamp)
+            if prepared:
+                updates.append((rule,) + prepared)
+    except ValidationError as err:
+        # Nothing was replaced yet, a bad collection must not ship along with the good ones
+        shutil.rmtree(GITHUB_ACTIONS_TMP_PATH, ignore_errors=True)
+        raise SystemExit(f"Refusing to update Remote Settings: {err}")
+
+    commit_settings_files(updates)
     
-    changes_detected = False
-    
-    for rule in config["rules"]:
-        print(f"Fetching rules for {rule['name']} from {rule['url']}")
-        rules = fetch_rules(rule["url"])
-        if rules:
-            tmp_file_path = os.path.join(GITHUB_ACTIONS_TMP_PATH, os.path.basename(rule["file"]))
-            save_tmp_rules(rules, tmp_file_path)
-            if update_settings_file(tmp_file_path, rule["file"], rule["name"]):
-                changes_detected = True
-    
-    if not changes_detected:
+    if not updates:
         print("No changes detected in any rules.")
 
 if __name__ == "__main__":
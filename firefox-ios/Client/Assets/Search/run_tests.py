@@ -1,14 +1,54 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+"""
+Overlay regression tests.
+
+Every overlay in Tests/Overlays is applied to every plugin in Tests/Base, and
+the result is compared with the golden file Tests/Expected/<plugin>/<overlay>.xml.
+To add a case, drop a new overlay or plugin in those directories and run
+`./run_tests.py --update-goldens` to generate the missing golden files. Existing
+golden files are only rewritten with `--update-goldens --force`, after an
+intended change of behavior.
+
+`./run_tests.py --benchmark` measures `Overlay.apply` throughput against every
+engine in SearchPlugins that has an overlay in SearchOverlays.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
 from lxml import etree
+import argparse
+import copy
+import os
 import sys
+import time
 import unittest
 
-from scrape_plugins import Overlay
+from search_scraper import Overlay
+
+BASE_DIR = "Tests/Base"
+OVERLAYS_DIR = "Tests/Overlays"
+EXPECTED_DIR = "Tests/Expected"
+
+updateGoldens = False
+forceGoldens = False
+
+def fixtureNames(directory):
+    return sorted(os.path.splitext(file)[0] for file in os.listdir(directory) if file.endswith(".xml"))
+
+def fixturePairs():
+    return [(plugin, overlay) for plugin in fixtureNames(BASE_DIR) for overlay in fixtureNames(OVERLAYS_DIR)]
+
+def expectedPath(plugin, overlay):
+    return os.path.join(EXPECTED_DIR, plugin, overlay + ".xml")
+
+def applyOverlay(plugin, overlay):
+    doc = etree.parse(os.path.join(BASE_DIR, plugin + ".xml"))
+    Overlay(os.path.join(OVERLAYS_DIR, overlay + ".xml")).apply(doc)
+    return etree.tostring(doc, encoding="unicode", pretty_print=True)
 
 class TestOverlays(unittest.TestCase):
     def setUp(self):
@@ -17,18 +57,71 @@ class TestOverlays(unittest.TestCase):
     def testAppend(self):
         overlay = Overlay("Tests/Overlays/append.xml")
         overlay.apply(self.plugin)
-        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/append.xml")
+        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/testplugin/append.xml")
 
     def testReplace(self):
         overlay = Overlay("Tests/Overlays/replace.xml")
         overlay.apply(self.plugin)
-        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/replace.xml")
+        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/testplugin/replace.xml")
+
+    def testGoldenFiles(self):
+        pairs = fixturePairs()
+        with ThreadPoolExecutor() as executor:
+            results = executor.map(lambda pair: applyOverlay(*pair), pairs)
+
+        for (plugin, overlay), actual in zip(pairs, results):
+            with self.subTest(plugin=plugin, overlay=overlay):
+                path = expectedPath(plugin, overlay)
+                if updateGoldens and (forceGoldens or not os.path.exists(path)):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "w") as file:
+                        file.write(actual)
+
+                self.assertTrue(os.path.exists(path), "Missing golden file %s, run with --update-goldens" % path)
+                with open(path, "r") as file:
+                    expected = file.read()
+                self.assertEqual(actual, expected, "\nExpected:\n%s\n\nActual:\n%s" % (expected, actual))
 
     def assertEqualsExpectedXML(self, plugin, expectedPath):
-        actual = etree.tostring(plugin, pretty_print=True)
+        actual = etree.tostring(plugin, encoding="unicode", pretty_print=True)
         with open(expectedPath, "r") as file:
             expected = file.read()
             self.assertEqual(actual, expected, "\nExpected:\n%s\n\nActual:\n%s" % (expected, actual))
 
+def benchmark(iterations):
+    cases = []
+    for root, dirs, files in os.walk("SearchPlugins"):
+        for file in sorted(files):
+            name, extension = os.path.splitext(file)
+            overlayPath = os.path.join("SearchOverlays", "%s.xml" % name.split("-")[0])
+            if extension == ".xml" and os.path.exists(overlayPath):
+                cases.append((etree.parse(os.path.join(root, file)), Overlay(overlayPath)))
+
+    if not cases:
+        print("No engine in SearchPlugins has an overlay, nothing to benchmark.")
+        return
+
+    # Copy the plugins up front so that only `Overlay.apply` is measured.
+    docs = [(copy.deepcopy(plugin), overlay) for _ in range(iterations) for plugin, overlay in cases]
+    start = time.perf_counter()
+    for doc, overlay in docs:
+        overlay.apply(doc)
+    elapsed = time.perf_counter() - start
+
+    print("Overlay.apply: %d engines x %d iterations in %.3fs (%.0f applies/s, %.1f us/apply)"
+          % (len(cases), iterations, elapsed, len(docs) / elapsed, elapsed / len(docs) * 1e6))
+
 if __name__ == '__main__':
-    unittest.main()
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--update-goldens", action="store_true")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--iterations", type=int, default=100)
+    args, remaining = parser.parse_known_args()
+
+    if args.benchmark:
+        benchmark(args.iterations)
+    else:
+        updateGoldens = args.update_goldens
+        forceGoldens = args.force
+        unittest.main(argv=[sys.argv[0]] + remaining)
@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Search plugin scraping engine shared by Firefox and Focus.
+
+Each product describes where its list of locales comes from (a locale source)
+and which directory its plugins are written to. Every download goes through a
+single `Fetcher`, which pools connections, downloads in parallel and caches
+each response by URL, so plugins used by both products are only fetched once.
+
+Usage:
+    ./search_scraper.py [--product firefox|focus] [--cache-dir DIR]
+
+Without `--product`, both products are refreshed from a single fetch.
+"""
+
+from lxml import html
+from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+import argparse
+import copy
+import hashlib
+import json
+import os
+import requests
+import shutil
+import subprocess
+import sys
+import threading
+
+SEARCH_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.realpath(os.path.join(SEARCH_DIR, "..", "..", "..", ".."))
+FOCUS_SEARCH_DIR = os.path.join(REPO_DIR, "focus-ios", "Search")
+SUPPORTED_LOCALES_CACHE = os.path.join(SEARCH_DIR, "supported_locales.json")
+
+# Seconds to wait for hg.mozilla.org to connect or send data before giving up.
+REQUEST_TIMEOUT = 30
+
+# Paths for en-US plugins included in the core Android repo.
+EN_PLUGINS_DIR_URL = "https://hg.mozilla.org/releases/mozilla-aurora/file/default/mobile/locales/en-US/searchplugins"
+EN_PLUGINS_FILE_URL = "https://hg.mozilla.org/releases/mozilla-aurora/raw-file/default/mobile/locales/en-US/searchplugins/%s"
+EN_PREFS_URL = "https://hg.mozilla.org/releases/mozilla-aurora/raw-file/default/mobile/locales/en-US/chrome/region.properties"
+
+# Paths for plugins in the l10n repos.
+L10N_LOCALE_LIST_URL = "https://hg.mozilla.org/releases/mozilla-aurora/raw-file/default/mobile/android/locales/all-locales"
+L10N_PLUGINS_DIR_URL = "https://hg.mozilla.org/releases/l10n/mozilla-aurora/%s/file/default/mobile/searchplugins"
+L10N_PLUGINS_FILE_URL = "https://hg.mozilla.org/releases/l10n/mozilla-aurora/%s/raw-file/default/mobile/searchplugins/%%s"
+L10N_PREFS_URL = "https://hg.mozilla.org/releases/l10n/mozilla-aurora/%s/raw-file/default/mobile/chrome/region.properties"
+
+MOZ_HEADER = """\
+<!-- This Source Code Form is subject to the terms of the Mozilla Public
+   - License, v. 2.0. If a copy of the MPL was not distributed with this
+   - file, You can obtain one at http://mozilla.org/MPL/2.0/. -->
+
+"""
+
+ns = { "search": "http://www.mozilla.org/2006/browser/search/" }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Imports search plugins for Firefox and Focus.")
+    parser.add_argument("--product", choices=["firefox", "focus"], action="append",
+                        help="product to refresh (can be repeated, defaults to all of them)")
+    parser.add_argument("--cache-dir", help="directory where downloaded files are kept between runs")
+    parser.add_argument("--refresh-locales", action="store_true",
+                        help="run get_supported_locales.swift even if its output is already cached")
+    args = parser.parse_args(argv)
+
+    factories = {"firefox": firefoxProduct, "focus": focusProduct}
+    products = [factories[name]() for name in (args.product or ["firefox", "focus"])]
+
+    fetcher = Fetcher(cacheDir=args.cache_dir)
+    try:
+        ScrapingEngine(fetcher, refreshLocales=args.refresh_locales).refresh(products)
+    finally:
+        fetcher.close()
+
+def firefoxProduct():
+    return Product("firefox", SEARCH_DIR, AllLocalesSource(), header=MOZ_HEADER)
+
+def focusProduct():
+    return Product("focus", FOCUS_SEARCH_DIR, ListJsonSource(os.path.join(FOCUS_SEARCH_DIR, "list.json")))
+
+def getSupportedLocales(product, refresh=False):
+    """Returns the locales supported by iOS, as listed by the product's get_supported_locales.swift.
+
+    Compiling and running the Swift script is slow and only works on macOS, so its output is
+    kept in SUPPORTED_LOCALES_CACHE, keyed by the SHA-256 of the script. The script only runs
+    again when it changes or when `refresh` is set. Entries marked `approximate` weren't
+    produced by the script: they're only used when Swift is unavailable, and replaced by its
+    output otherwise. Without Swift and without any entry, the scraper stops: guessing the
+    locales would delete the plugins of the missing ones.
+    """
+    script = os.path.join(product.directory, "get_supported_locales.swift")
+    with open(script, "rb") as f:
+        key = hashlib.sha256(f.read()).hexdigest()
+
+    cache = {}
+    if os.path.exists(SUPPORTED_LOCALES_CACHE):
+        with open(SUPPORTED_LOCALES_CACHE) as f:
+            cache = json.load(f)
+
+    entry = cache.get(key)
+    hasSwift = shutil.which("swift") is not None
+    if entry and not refresh and not (entry.get("approximate") and hasSwift):
+        return entry["locales"]
+
+    if not hasSwift:
+        if entry:
+            print("warning: swift is unavailable, using the approximate locales of %s for %s"
+                  % (SUPPORTED_LOCALES_CACHE, script))
+            return entry["locales"]
+        sys.exit("error: swift is unavailable and %s has no up-to-date entry for %s, run the scraper on macOS"
+                 % (SUPPORTED_LOCALES_CACHE, script))
+
+    output = subprocess.run(["./get_supported_locales.swift"], cwd=product.directory, stdout=subprocess.PIPE, check=True).stdout
+    cache[key] = {"locales": sorted(json.loads(output.decode("utf-8").replace("_", "-")))}
+    with open(SUPPORTED_LOCALES_CACHE, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return cache[key]["locales"]
+
+
+class Fetcher:
+    """Downloads files in parallel over a pooled session.
+
+    Each URL is requested at most once per fetcher: concurrent requests for the
+    same URL share a single download. When `cacheDir` is set, responses are also
+    kept on disk so that later runs can reuse them.
+    """
+
+    def __init__(self, cacheDir=None, maxWorkers=16):
+        self.cacheDir = cacheDir
+        if cacheDir and not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=maxWorkers, pool_maxsize=maxWorkers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers)
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.downloads = 0
+
+    def prefetch(self, urls):
+        """Starts downloading `urls` in the background."""
+        for url in urls:
+            self._future(url)
+
+    def get(self, url):
+        """Returns the content of `url` as bytes, or None if it could not be downloaded."""
+        return self._future(url).result()
+
+    def getText(self, url):
+        content = self.get(url)
+        return None if content is None else content.decode("utf-8")
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def _future(self, url):
+        with self.lock:
+            future = self.futures.get(url)
+            if future is None:
+                future = self.executor.submit(self._download, url)
+                self.futures[url] = future
+            return future
+
+    def _download(self, url):
+        cachePath = self._cachePath(url)
+        if cachePath and os.path.exists(cachePath):
+            with open(cachePath, "rb") as f:
+                return f.read()
+
+        response = self.session.get(url, timeout=REQUEST_TIMEOUT)
+        if not response.ok:
+            return None
+
+        with self.lock:
+            self.downloads += 1
+
+        if cachePath:
+            tmpPath = "%s.%d.tmp" % (cachePath, threading.get_ident())
+            with open(tmpPath, "wb") as f:
+                f.write(response.content)
+            os.replace(tmpPath, cachePath)
+        return response.content
+
+    def _cachePath(self, url):
+        if not self.cacheDir:
+            return None
+        return os.path.join(self.cacheDir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+
+class Scraper:
+    def __init__(self, fetcher, pluginsDirURL, pluginsFileURL, prefsURL, defaultPrefName):
+        self.fetcher = fetcher
+        self.pluginsDirURL = pluginsDirURL
+        self.pluginsFileURL = pluginsFileURL
+        self.prefsURL = prefsURL
+        self.defaultPrefName = defaultPrefName
+
+    def fileURL(self, file):
+        return self.pluginsFileURL % file
+
+    def getFileList(self):
+        content = self.fetcher.get(self.pluginsDirURL)
+        if content is None:
+            raise Exception("error: could not read plugins directory")
+
+        tree = html.fromstring(content)
+        return tree.xpath('//a[@class="list"]/text()')
+
+    def getEngineList(self):
+        # The raw-file view of a directory lists one entry per line, the file name being last.
+        content = self.fetcher.getText(self.fileURL(""))
+        if content is None:
+            raise Exception("error: could not read plugins directory")
+
+        files = [line.split(" ")[-1] for line in content.strip().split("\n")]
+        return [f[:-4] for f in files if f.endswith(".xml")]
+
+    def getFile(self, file):
+        return self.fetcher.get(self.fileURL(file))
+
+    def getDefault(self):
+        content = self.fetcher.getText(self.prefsURL)
+        if content is None:
+            raise Exception("error: could not read prefs file")
+
+        lines = content.strip().split("\n")
+        for line in lines:
+            values = line.strip().split("=")
+            if len(values) == 2 and values[0].strip() == self.defaultPrefName:
+                default = values[1].strip()
+                return default
+
+        raise Exception("error: no default pref found")
+
+
+class L10nScraper(Scraper):
+    def __init__(self, fetcher, locale):
+        Scraper.__init__(self, fetcher,
+                         pluginsDirURL=L10N_PLUGINS_DIR_URL % locale,
+                         pluginsFileURL=L10N_PLUGINS_FILE_URL % locale,
+                         prefsURL=L10N_PREFS_URL % locale,
+                         defaultPrefName="browser.search.defaultenginename")
+
+
+class EnScraper(Scraper):
+    def __init__(self, fetcher):
+        Scraper.__init__(self, fetcher,
+                         pluginsDirURL=EN_PLUGINS_DIR_URL,
+                         pluginsFileURL=EN_PLUGINS_FILE_URL,
+                         prefsURL=EN_PREFS_URL,
+                         defaultPrefName="browser.search.defaultenginename.US")
+
+
+class Target:
+    """A `SearchPlugins/<code>` directory and the files to download into it."""
+
+    def __init__(self, code, scraper, files, default=None):
+        self.code = code
+        self.scraper = scraper
+        self.files = files
+        self.default = default
+
+    def urls(self):
+        return [self.scraper.fileURL(file) for file in self.files]
+
+
+class AllLocalesSource:
+    """Imports every supported locale listed in the Android all-locales file, with
+    all plugins found in its l10n repo and its default engine. Used by Firefox."""
+
+    def getTargets(self, fetcher, supportedLocales):
+        scrapers = [("en", EnScraper(fetcher))]
+
+        content = fetcher.getText(L10N_LOCALE_LIST_URL)
+        if content is None:
+            raise Exception("error: could not read locale list")
+
+        for locale in content.strip().split("\n"):
+            if locale not in supportedLocales:
+                print("skipping unsupported locale: %s" % locale)
+                continue
+            scrapers.append((locale, L10nScraper(fetcher, locale)))
+
+        # Directory listings and prefs don't depend on each other, request them all up front.
+        fetcher.prefetch(url for _, scraper in scrapers for url in (scraper.pluginsDirURL, scraper.prefsURL))
+
+        targets = []
+        for locale, scraper in scrapers:
+            print("scraping: %s..." % locale)
+            files = scraper.getFileList()
+            default = scraper.getDefault()
+            print("  default: %s" % default)
+            targets.append(Target(locale, scraper, files, default=default))
+        return targets
+
+    def finish(self, product, targets):
+        print("verifying engines...")
+        pluginsDir = product.pluginsDir()
+        enDir = os.path.join(pluginsDir, "en")
+        for locale in os.listdir(pluginsDir):
+            if locale.startswith("."): continue
+            localeDir = os.path.join(pluginsDir, locale)
+            with open(os.path.join(localeDir, "list.txt")) as f:
+                engineList = f.read().splitlines()
+
+            for engine in engineList:
+                if engine.endswith(":hidden"): continue
+                path = os.path.join(localeDir, engine + ".xml")
+                enPath = os.path.join(enDir, engine + ".xml")
+                if not os.path.exists(path) and not os.path.exists(enPath):
+                    print("  ERROR: missing engine %s for locale %s" % (engine, locale))
+
+
+class ListJsonSource:
+    """Imports the visible engines of every supported locale and region in a
+    `list.json` file, and writes them to `SearchEngines.plist`. Used by Focus."""
+
+    def __init__(self, path):
+        self.path = path
+        self.engines = {}
+
+    def getTargets(self, fetcher, supportedLocales):
+        with open(self.path) as listFile:
+            plugins = json.load(listFile)
+
+        self.engines = {}
+        targets = []
+
+        # Import engines from the l10n repos.
+        locales = plugins["locales"]
+        for locale in locales:
+            regions = locales[locale]
+            for region in regions:
+                if region == "default":
+                    code = locale
+                else:
+                    language = locale.split("-")[0]
+                    code = ("%s-%s" % (language, region))
+
+                if code in supportedLocales:
+                    print("adding %s..." % code)
+                else:
+                    print("skipping %s" % code)
+                    continue
+
+                visibleEngines = self.filterEngines(regions[region]["visibleDefaultEngines"])
+                targets.append(Target(code, L10nScraper(fetcher, locale), [engine + ".xml" for engine in visibleEngines]))
+                self.engines[code] = visibleEngines
+
+        # Import default engines from the core repo.
+        print("adding defaults...")
+        scraper = EnScraper(fetcher)
+        defaultEngines = self.filterEngines(scraper.getEngineList())
+        targets.append(Target("default", scraper, [engine + ".xml" for engine in defaultEngines]))
+        self.engines["default"] = plugins["default"]["visibleDefaultEngines"]
+
+        # Remove Bing.
+        if "bing" in self.engines["default"]: self.engines["default"].remove("bing")
+
+        return targets
+
+    def filterEngines(self, engines):
+        # Remove Bing.
+        if "bing" in engines: engines.remove("bing")
+
+        # Always include DuckDuckGo.
+        if "duckduckgo" not in engines:
+            lastEngine = "~"
+            for i, engine in reversed(list(enumerate(engines))):
+                if i > 0 and "duckduckgo" < engine and engine < lastEngine and not engine.startswith("google"):
+                    lastEngine = engine
+                    continue
+                engines.insert(i + 1, "duckduckgo")
+                break
+
+        return engines
+
+    def finish(self, product, targets):
+        self.verifyEngines(product.pluginsDir())
+        self.writeList(os.path.join(product.directory, "SearchEngines.plist"))
+
+    def verifyEngines(self, pluginsDir):
+        # Make sure fallback directories contain any skipped engines.
+        print("verifying engines...")
+        error = False
+        for locale in self.engines:
+            dirs = [locale, locale.split("-")[0], "default"]
+            dirs = [os.path.join(pluginsDir, dir) for dir in dirs]
+            for engine in self.engines[locale]:
+                file = engine + ".xml"
+                if not any(os.path.exists(os.path.join(dir, file)) for dir in dirs):
+                    error = True
+                    print("  ERROR: missing engine %s for locale %s" % (engine, locale))
+        if not error:
+            print("  OK!")
+
+    def writeList(self, path):
+        # Write the list of engine names for each locale.
+        root = etree.Element("dict")
+        for locale in sorted(self.engines.keys()):
+            key = etree.Element("key")
+            key.text = locale
+            root.append(key)
+            values = etree.Element("array")
+            for engine in self.engines[locale]:
+                value = etree.Element("string")
+                value.text = engine
+                values.append(value)
+            root.append(values)
+
+        plist = etree.tostring(root, encoding="utf-8", pretty_print=True)
+        with open(path, "wb") as outfile:
+            outfile.write(plist)
+
+
+class Product:
+    """A search directory (holding `SearchPlugins` and `SearchOverlays`) and the source of its locales."""
+
+    def __init__(self, name, directory, source, header=""):
+        self.name = name
+        self.directory = directory
+        self.source = source
+        self.header = header
+        self.overlays = {}
+
+    def pluginsDir(self):
+        return os.path.join(self.directory, "SearchPlugins")
+
+    def overlayForEngine(self, engine):
+        if engine not in self.overlays:
+            path = os.path.join(self.directory, "SearchOverlays", "%s.xml" % engine)
+            self.overlays[engine] = Overlay(path) if os.path.exists(path) else None
+        return self.overlays[engine]
+
+
+class ScrapingEngine:
+    def __init__(self, fetcher, refreshLocales=False):
+        self.fetcher = fetcher
+        self.refreshLocales = refreshLocales
+
+    def refresh(self, products):
+        plans = []
+        for product in products:
+            print("collecting %s locales..." % product.name)
+            supportedLocales = set(getSupportedLocales(product, refresh=self.refreshLocales))
+            targets = product.source.getTargets(self.fetcher, supportedLocales)
+            plans.append((product, targets))
+
+        # Queue the plugins of every product before writing anything, so that all downloads
+        # overlap and plugins shared between products are only fetched once.
+        self.fetcher.prefetch(url for _, targets in plans for target in targets for url in target.urls())
+
+        for product, targets in plans:
+            self.writeProduct(product, targets)
+
+        print("done: %d files downloaded" % self.fetcher.downloads)
+
+    def writeProduct(self, product, targets):
+        print("writing %s plugins..." % product.name)
+
+        # Remove and recreate the SearchPlugins directory.
+        pluginsDir = product.pluginsDir()
+        if os.path.exists(pluginsDir):
+            shutil.rmtree(pluginsDir)
+        os.makedirs(pluginsDir)
+
+        for target in targets:
+            directory = os.path.join(pluginsDir, target.code)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+            if target.default is not None:
+                with open(os.path.join(directory, "default.txt"), "w", encoding="utf-8") as f:
+                    f.write(target.default)
+
+            for file in target.files:
+                contents = target.scraper.getFile(file)
+                if contents is None:
+                    print("  skipping: %s/%s..." % (target.code, file))
+                    continue
+
+                # Apply iOS-specific overlays for this engine if they are defined.
+                name, extension = os.path.splitext(file)
+                if extension == ".xml":
+                    overlay = product.overlayForEngine(name.split("-")[0])
+                    if overlay:
+                        plugin = etree.ElementTree(etree.fromstring(contents))
+                        overlay.apply(plugin)
+                        contents = product.header.encode("utf-8") + etree.tostring(plugin.getroot(), encoding="utf-8", pretty_print=True)
+
+                with open(os.path.join(directory, file), "wb") as outfile:
+                    outfile.write(contents)
+
+        product.source.finish(product, targets)
+
+
+class Overlay:
+    def __init__(self, path):
+        overlay = etree.parse(path)
+        self.actions = overlay.getroot().getchildren()
+
+    def apply(self, doc):
+        for action in self.actions:
+            if action.tag == "replace":
+                # An empty replace removes the target.
+                replacement = action[0] if len(action) else None
+                self.replace(target=action.get("target"), replacement=replacement, doc=doc)
+            elif action.tag == "append":
+                self.append(parent=action.get("parent"), child=action[0], doc=doc)
+
+    def replace(self, target, replacement, doc):
+        for element in doc.xpath(target, namespaces=ns):
+            if replacement is None:
+                self.remove(element)
+                continue
+
+            replacementCopy = copy.deepcopy(replacement)
+            element.getparent().replace(element, replacementCopy)
+
+            # Try to preserve indentation.
+            replacementCopy.tail = element.tail
+
+    def remove(self, element):
+        # Keep the indentation of the following sibling.
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = element.tail
+        element.getparent().remove(element)
+
+    def append(self, parent, child, doc):
+        for element in doc.xpath(parent, namespaces=ns):
+            childCopy = copy.deepcopy(child)
+            element.append(childCopy)
+
+            # Try to preserve indentation.
+            childCopy.tail = "\n"
+            previous = childCopy.getprevious()
+            if previous is not None:
+                childCopy.tail = previous.tail
+                prevPrevious = previous.getprevious()
+                if prevPrevious is not None:
+                    previous.tail = prevPrevious.tail
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,19 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
-from lxml import etree
-import sys
-import unittest
-
-from scrape_plugins import Overlay
-
-class TestOverlays(unittest.TestCase):
-    def setUp(self):
-        self.plugin = etree.parse("Tests/Base/testplugin.xml")
+# The overlay tests are shared with Firefox, see
+# firefox-ios/Client/Assets/Search/run_tests.py. Run from this directory, they
+# use the Focus fixtures in Tests and the Focus plugins in SearchPlugins.
 
-    def testAppend(self):
-        overlay = Overlay("Tests/Overlays/append.xml")
-        overlay.apply(self.plugin)
-        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/append.xml")
-
-    def testReplace(self):
-        overlay = Overlay("Tests/Overlays/replace.xml")
-        overlay.apply(self.plugin)
-        self.assertEqualsExpectedXML(plugin=self.plugin, expectedPath="Tests/Expected/replace.xml")
+import os
+import runpy
+import sys
 
-    def assertEqualsExpectedXML(self, plugin, expectedPath):
-        actual = etree.tostring(plugin, pretty_print=True)
-        with open(expectedPath, "r") as file:
-            expected = file.read()
-            self.assertEqual(actual, expected, "\nExpected:\n%s\n\nActual:\n%s" % (expected, actual))
+SEARCH_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "firefox-ios", "Client", "Assets", "Search")
 
-if __name__ == '__main__':
-    unittest.main()
+if __name__ == "__main__":
+    sys.path.insert(0, SEARCH_DIR)
+    runpy.run_path(os.path.join(SEARCH_DIR, "run_tests.py"), run_name="__main__")
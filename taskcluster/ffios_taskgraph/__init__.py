@@ -2,6 +2,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import os
 from importlib import import_module
 
 from mozilla_taskgraph import register as register_mozilla_taskgraph
@@ -22,7 +23,13 @@ def register(graph_config):
     # Setup mozilla-taskgraph
     register_mozilla_taskgraph(graph_config)
 
-    _import_modules(["job", "parameters", "routes", "target_tasks"])
+    profile_path = os.environ.get("FFIOS_TASKGRAPH_PROFILE")
+    if profile_path:
+        from .util.profile import enable_profiling
+
+        enable_profiling(profile_path)
+
+    _import_modules(["job", "optimize", "parameters", "routes", "target_tasks"])
 
 
 def _import_modules(modules):
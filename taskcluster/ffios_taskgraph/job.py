@@ -3,11 +3,24 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import re
+from functools import lru_cache
+
 from taskgraph.transforms.run import run_task_using, configure_taskdesc_for_run
 from taskgraph.util.schema import Schema, taskref_or_string
 from voluptuous import Required, Optional
 
-from pipes import quote as shell_quote
+from shlex import quote as shell_quote
+
+# run-task gets the command as a single argument, which Linux caps to
+# MAX_ARG_STRLEN bytes.
+MAX_COMMAND_LENGTH = 131072 - 1
+# The command is checked before taskgraph resolves its references: a
+# `<dependency>` becomes a task id and a `<dependency/path>` a queue URL like
+# https://firefox-ci-tc.services.mozilla.com/api/queue/v1/task/<task id>/artifacts/<path>,
+# so each of them is counted as this many more bytes.
+REFERENCE_HEADROOM = 128
+REFERENCE_PATTERN = re.compile("<([^>]+)>")
 
 secret_schema = {
     Required("name"): str,
@@ -36,30 +49,37 @@ def configure_run_commands_schema(config, task, taskdesc):
 
     all_commands = pre_commands + run.pop("commands", [])
 
-    run["command"] = _convert_commands_to_string(all_commands)
+    run["command"] = _convert_commands_to_string(all_commands, label=task.get("label", task.get("name")))
     _inject_secrets_scopes(run, taskdesc)
     _set_run_task_attributes(task)
     configure_taskdesc_for_run(config, task, taskdesc, task["worker"]["implementation"])
 
 
 def _generate_secret_command(secret):
-    secret_command = [
+    return list(_get_secret_command(secret["name"], secret["key"], secret["path"], secret.get("json", False)))
+
+
+@lru_cache(maxsize=None)
+def _get_secret_command(name, key, path, json):
+    secret_command = (
         "python3",
         "taskcluster/scripts/get-secret.py",
-        "-s", secret["name"],
-        "-k", secret["key"],
-        "-f", secret["path"],
-    ]
-    if secret.get("json"):
-        secret_command.append("--json")
+        "-s", name,
+        "-k", key,
+        "-f", path,
+    )
+    if json:
+        secret_command += ("--json",)
 
     return secret_command
 
 
-def _convert_commands_to_string(commands):
+def _convert_commands_to_string(commands, label=None):
     should_artifact_reference = False
     should_task_reference = False
 
+    references = 0
+
     sanitized_commands = []
     for command in commands:
         sanitized_parts = []
@@ -73,15 +93,24 @@ def _convert_commands_to_string(commands):
                     should_task_reference = True
                 else:
                     raise ValueError(f'Unsupported dict: {part}')
+                references += len(REFERENCE_PATTERN.findall(part_string))
             else:
                 part_string = part
 
             sanitized_parts.append(part_string)
-        sanitized_commands.append(sanitized_parts)
+        sanitized_commands.append(tuple(sanitized_parts))
 
-    shell_quoted_commands = [" ".join(map(shell_quote, command)) for command in sanitized_commands]
+    shell_quoted_commands = [_quote_command(command) for command in sanitized_commands]
     full_string_command = " && ".join(shell_quoted_commands)
 
+    command_length = len(full_string_command.encode("utf-8")) + references * REFERENCE_HEADROOM
+    if command_length > MAX_COMMAND_LENGTH:
+        raise ValueError(
+            f"The command of {label or 'the task'} is {command_length} bytes long, counting "
+            f"{REFERENCE_HEADROOM} bytes for each of its {references} unresolved reference(s), "
+            f"more than the {MAX_COMMAND_LENGTH} a worker accepts. Move some of it into a script."
+        )
+
     if should_artifact_reference and should_task_reference:
         raise NotImplementedError('"arifact-reference" and "task-reference" cannot be both used')
     elif should_artifact_reference:
@@ -92,12 +121,22 @@ def _convert_commands_to_string(commands):
         return full_string_command
 
 
+@lru_cache(maxsize=None)
+def _quote_command(command):
+    # Commands like the secret ones are the same across tasks, quote them once
+    return " ".join(map(shell_quote, command))
+
+
 def _inject_secrets_scopes(run, taskdesc):
     secrets = run.pop("secrets", [])
     scopes = taskdesc.setdefault("scopes", [])
-    new_secret_scopes = ["secrets:get:{}".format(secret["name"]) for secret in secrets]
-    new_secret_scopes = list(set(new_secret_scopes))  # Scopes must not have any duplicates
-    scopes.extend(new_secret_scopes)
+    # Scopes must not have any duplicates, even with the ones already there
+    known_scopes = set(scopes)
+    for secret in secrets:
+        scope = "secrets:get:{}".format(secret["name"])
+        if scope not in known_scopes:
+            known_scopes.add(scope)
+            scopes.append(scope)
 
 
 def _set_run_task_attributes(task):
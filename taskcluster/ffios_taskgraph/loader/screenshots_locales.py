@@ -3,10 +3,12 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import json
+import os
 from math import log, ceil
 
 from taskgraph.loader.transform import loader as base_loader
-from ffios_taskgraph.util.chunkify import chunkify
+from ffios_taskgraph.util.chunkify import chunkify, chunkify_weighted
 
 from ..screenshots_locales import get_screenshots_locales
 
@@ -23,18 +25,32 @@ def loader(kind, path, config, params, loaded_tasks):
         # We need one last chunk to include locales in remainder
         chunks = int(chunks + 1)
 
+    chunk_weights = config.get("chunk-weights")
+    if chunk_weights:
+        # Balance the chunks by how long their locales took to generate, rather
+        # than by their number of locales, so that no chunk lags far behind.
+        durations = _load_durations(os.path.join(path, chunk_weights))
+        all_chunk_locales = chunkify_weighted(
+            filtered_locales, chunks, durations["locales"], durations["default"]
+        )
+    else:
+        all_chunk_locales = [
+            chunkify(filtered_locales, this_chunk, chunks)
+            # Chunks starts at 1 (and not 0)
+            for this_chunk in range(1, chunks + 1)
+        ]
+
     # Taskcluster sorts task names alphabetically, we need numbers to be zero-padded.
     max_number_of_digits = _get_number_of_digits(chunks)
 
     tasks = {
         str(this_chunk).zfill(max_number_of_digits): {
             "attributes": {
-                "chunk_locales": chunkify(filtered_locales, this_chunk, chunks),
+                "chunk_locales": chunk_locales,
                 "l10n_chunk": str(this_chunk),
             }
         }
-        # Chunks starts at 1 (and not 0)
-        for this_chunk in range(1, chunks + 1)
+        for this_chunk, chunk_locales in enumerate(all_chunk_locales, start=1)
     }
 
     config["tasks"] = tasks
@@ -42,6 +58,15 @@ def loader(kind, path, config, params, loaded_tasks):
     return base_loader(kind, path, config, params, loaded_tasks)
 
 
+def _load_durations(path):
+    with open(path) as f:
+        durations = json.load(f)
+    return {
+        "default": durations["default"],
+        "locales": durations.get("locales", {}),
+    }
+
+
 def _get_number_of_digits(number):
     # XXX We add 1 to number because `log(100)` returns 2 instead of 3
     return int(ceil(log(number + 1, 10)))
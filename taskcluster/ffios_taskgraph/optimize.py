@@ -0,0 +1,70 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import logging
+import re
+from functools import lru_cache
+
+from taskgraph.optimize.base import OptimizationStrategy, registry
+from taskgraph.util.path import MATCH_STAR_STAR_END_RE, MATCH_STAR_STAR_RE
+
+from .parameters import get_changed_files
+
+logger = logging.getLogger(__name__)
+
+# Cron and action tasks don't come with the files of a push, they must never
+# be skipped because of them.
+PUSH_TASKS_FOR = ("github-push", "github-pull-request")
+
+
+@lru_cache(maxsize=None)
+def compile_patterns(patterns):
+    """Compile file patterns into a single regex, matching paths like
+    `taskgraph.util.path.match` does with any of the patterns.
+
+    >>> regex = compile_patterns(("firefox-ios/**/*.swift", "bitrise.yml"))
+    >>> bool(regex.match("firefox-ios/Client/AppDelegate.swift"))
+    True
+    >>> bool(regex.match("focus-ios/Blockzilla/AppDelegate.swift"))
+    False
+
+    """
+    alternatives = []
+    for pattern in patterns:
+        if not pattern:
+            return re.compile("")
+        p = re.escape(pattern)
+        p = MATCH_STAR_STAR_RE.sub(r"\1(?:.+/)?", p)
+        p = MATCH_STAR_STAR_END_RE.sub(r"(?:\1.+)?", p)
+        alternatives.append(p.replace(r"\*", "[^/]*"))
+    return re.compile("(?:{})(?:/.*)?$".format("|".join(alternatives)))
+
+
+class SkipUnlessChanged(OptimizationStrategy):
+    """Like taskgraph's `skip-unless-changed`, with the patterns of a task
+    compiled once and matched against the changed files in a single pass,
+    whose result is shared by every task declaring the same patterns.
+    """
+
+    description = "skip-unless-changed"
+
+    def should_remove_task(self, task, params, file_patterns):
+        if not params["tasks_for"].startswith(PUSH_TASKS_FOR):
+            return False
+        # pushlog_id == -1 - this is the case when run from a cron.yml job or on a git repository
+        if params.get("repository_type") == "hg" and params.get("pushlog_id") == -1:
+            return False
+
+        changed_files = get_changed_files(params)
+        if not changed_files.match(compile_patterns(tuple(file_patterns))):
+            logger.debug(
+                f'no files found matching a pattern in `skip-unless-changed` for "{task.label}"'
+            )
+            return True
+        return False
+
+
+# Task schemas only accept the optimizations taskgraph knows about, replace its
+# implementation rather than registering a new name.
+registry["skip-unless-changed"] = SkipUnlessChanged()
@@ -27,10 +27,42 @@ extend_parameters_schema(
 
 def get_decision_parameters(graph_config, parameters):
     repo = get_repository(os.getcwd())
-    parameters["commit_message"] = repo.get_commit_message()
+    parameters["commit_message"] = repo.get_commit_message(parameters["head_rev"])
 
     pr_number = os.environ.get("MOBILE_PULL_REQUEST_NUMBER", None)
     if pr_number:
         pr_number = int(pr_number)
     parameters["pull_request_number"] = pr_number
 
+
+class ChangedFiles:
+    """The files changed by a push, with the result of every regex matched
+    against them.
+    """
+
+    def __init__(self, files_changed):
+        self.files = frozenset(files_changed)
+        self._matches = {}
+
+    def match(self, regex):
+        """Whether any changed file matches `regex`, checked once per regex."""
+        if regex not in self._matches:
+            self._matches[regex] = any(regex.match(path) for path in self.files)
+        return self._matches[regex]
+
+
+# The files changed of the graph being generated, and their ChangedFiles
+_changed_files = (None, None)
+
+
+def get_changed_files(parameters):
+    """Return the ChangedFiles of `parameters["files_changed"]`.
+
+    Taskgraph computes them once in the decision task, so they're indexed once
+    too, then shared by every task until they change.
+    """
+    global _changed_files
+    files_changed = tuple(parameters["files_changed"])
+    if _changed_files[0] != files_changed:
+        _changed_files = (files_changed, ChangedFiles(files_changed))
+    return _changed_files[1]
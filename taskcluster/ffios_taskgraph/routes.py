@@ -4,18 +4,24 @@
 
 
 import time
+from functools import lru_cache
 
 from taskgraph.transforms.task import index_builder
 
 # Please ping the l10n team and contributors if these routes change.
 # In the future, notifying consumers may be easier (https://bugzilla.mozilla.org/show_bug.cgi?id=1548810), but
 # we need to remember to tell users for the time being
-SCREENSHOTS_ROUTE_TEMPLATES = [
+SCREENSHOTS_ROUTE_TEMPLATES = (
     "index.{trust-domain}.v2.{project}.{variant}.latest.{locale}",
     "index.{trust-domain}.v2.{project}.{variant}.{build_date}.revision.{head_rev}.{locale}",
     "index.{trust-domain}.v2.{project}.{variant}.{build_date}.latest.{locale}",
     "index.{trust-domain}.v2.{project}.{variant}.revision.{head_rev}.{locale}",
-]
+)
+
+# Taskcluster rejects tasks with more routes than that. Taskgraph adds the
+# treeherder and checks routes after the index builders run.
+MAX_ROUTES_PER_TASK = 64
+ROUTES_ADDED_BY_TASKGRAPH = 2
 
 
 @index_builder("l10n-screenshots")
@@ -23,23 +29,48 @@ def add_signing_indexes(config, task):
     if config.params["level"] != "3":
         return task
 
-    subs = config.params.copy()
-    subs["build_date"] = time.strftime(
-        "%Y.%m.%d", time.gmtime(config.params["build_date"])
+    route_affixes = _compile_route_templates(
+        SCREENSHOTS_ROUTE_TEMPLATES,
+        trust_domain=config.graph_config["trust-domain"],
+        project=config.params["project"],
+        build_date=config.params["build_date"],
+        head_rev=config.params["head_rev"],
     )
-    subs["trust-domain"] = config.graph_config["trust-domain"]
-    subs["variant"] = "l10n-screenshots"
 
-    routes = task.setdefault("routes", [])
-    for tpl in SCREENSHOTS_ROUTE_TEMPLATES:
-        for locale in task["attributes"]["chunk_locales"]:
-            subs["locale"] = locale
-            routes.append(tpl.format(**subs))
+    routes = set(task.get("routes", []))
+    routes.update(_generate_routes(route_affixes, task["attributes"]["chunk_locales"]))
+
+    max_routes = MAX_ROUTES_PER_TASK - ROUTES_ADDED_BY_TASKGRAPH
+    if len(routes) > max_routes:
+        raise Exception(
+            f"Task {task['label']} would have {len(routes)} routes, more than the {max_routes} "
+            "allowed. Lower the number of locales per chunk."
+        )
 
-    task["routes"] = _deduplicate_and_sort_sequence(routes)
+    task["routes"] = sorted(routes)
 
     return task
 
 
-def _deduplicate_and_sort_sequence(sequence):
-    return sorted(list(set(sequence)))
+@lru_cache(maxsize=None)
+def _compile_route_templates(templates, trust_domain, project, build_date, head_rev):
+    """Format the parts of each template that don't depend on the locale, once
+    per graph, and return them as (prefix, suffix) pairs."""
+    subs = {
+        "trust-domain": trust_domain,
+        "project": project,
+        "variant": "l10n-screenshots",
+        "build_date": time.strftime("%Y.%m.%d", time.gmtime(build_date)),
+        "head_rev": head_rev,
+    }
+    route_affixes = []
+    for tpl in templates:
+        prefix, suffix = tpl.split("{locale}")
+        route_affixes.append((prefix.format(**subs), suffix.format(**subs)))
+    return tuple(route_affixes)
+
+
+def _generate_routes(route_affixes, locales):
+    for prefix, suffix in route_affixes:
+        for locale in locales:
+            yield f"{prefix}{locale}{suffix}"
@@ -2,22 +2,66 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import argparse
+import json
 import os
-from functools import cache
 
+current_dir = os.path.dirname(os.path.realpath(__file__))
+project_dir = os.path.realpath(os.path.join(current_dir, '..', '..'))
 
-@cache
-def get_screenshots_locales():
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    project_dir = os.path.realpath(os.path.join(current_dir, '..', '..'))
+LOCALES_DIR = os.path.join(project_dir, 'firefox-ios/Client')
+
+
+class LocaleRegistry:
+    """Locales found in a directory, which has one *.lproj file per locale.
+
+    They're listed again only when the modification time of the directory
+    changes, that is when a locale is added or removed. A registry loaded from
+    a manifest never changes.
+    """
+
+    def __init__(self, locales_dir=None, locales=None):
+        self.locales_dir = locales_dir
+        self._locales = sorted(locales) if locales is not None else None
+        self._mtime = None
+
+    @classmethod
+    def from_manifest(cls, path):
+        with open(path) as f:
+            return cls(locales=json.load(f)["locales"])
+
+    def get_locales(self):
+        if self.locales_dir is not None:
+            mtime = os.stat(self.locales_dir).st_mtime_ns
+            if mtime != self._mtime:
+                self._locales = self._list_locales()
+                self._mtime = mtime
+        return list(self._locales)
 
-    config = {"locales": []}
+    def _list_locales(self):
+        # Save only the locale's name
+        return sorted(
+            file[:-len(".lproj")]
+            for file in os.listdir(self.locales_dir)
+            if file.endswith(".lproj")
+        )
+
+    def write_manifest(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"locales": self.get_locales()}, f, indent=4)
+            f.write("\n")
+        os.replace(tmp_path, path)
+
+
+_registry = LocaleRegistry(LOCALES_DIR)
+
+
+def get_screenshots_locales():
+    return _registry.get_locales()
 
-    # Check all *.lproj files as there is one per locale
-    for file in os.listdir(os.path.join(project_dir, 'firefox-ios/Client')):
-        if file.endswith(".lproj"):
-                config["locales"].append(file)
 
-    # Save only the locale's name
-    config["locales"] = [item.replace(".lproj", "") for item in config["locales"]]
-    return sorted(config["locales"])
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Writes the locales to take screenshots of to a JSON manifest.")
+    parser.add_argument("manifest", help="path of the manifest to write")
+    _registry.write_manifest(parser.parse_args().manifest)
@@ -5,30 +5,32 @@
 
 from taskgraph.target_tasks import register_target_task
 
+# Target task methods, declared by the kinds they run. `attributes`, if given,
+# further restricts them to the tasks having all these attribute values.
+TARGET_TASK_SETS = {
+    "l10n_screenshots": {"kinds": ["generate-screenshots"]},
+    "bitrise_performance_test": {"kinds": ["bitrise-performance"]},
+    "firebase_performance_test": {"kinds": ["firebase-performance"]},
+}
 
-@register_target_task('l10n_screenshots')
-def target_tasks_default(full_task_graph, parameters, graph_config):
-    """Target the tasks which have indicated they should be run on this project
-    via the `run_on_projects` attributes."""
-    def filter(task, parameters):
-        return task.kind == "generate-screenshots"
 
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+def select_tasks(full_task_graph, kinds, attributes=None):
+    return [
+        label
+        for label, task in full_task_graph.tasks.items()
+        if task.kind in kinds
+        and all(task.attributes.get(name) == value for name, value in (attributes or {}).items())
+    ]
 
-@register_target_task('bitrise_performance_test')
-def target_tasks_default(full_task_graph, parameters, graph_config):
-    """Target the tasks which have indicated they should be run on this project
-    via the `run_on_projects` attributes."""
-    def filter(task, parameters):
-        return task.kind == "bitrise-performance"
 
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+def _register_target_task_set(name, kinds, attributes=None):
+    def target_tasks(full_task_graph, parameters, graph_config):
+        return select_tasks(full_task_graph, kinds, attributes)
 
-@register_target_task('firebase_performance_test')
-def target_tasks_default(full_task_graph, parameters, graph_config):
-    """Target the tasks which have indicated they should be run on this project
-    via the `run_on_projects` attributes."""
-    def filter(task, parameters):
-        return task.kind == "firebase-performance"
+    target_tasks.__name__ = f"target_tasks_{name}"
+    target_tasks.__doc__ = f"Target the tasks of the {', '.join(kinds)} kinds."
+    register_target_task(name)(target_tasks)
 
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+
+for name, target_task_set in TARGET_TASK_SETS.items():
+    _register_target_task_set(name, **target_task_set)
@@ -2,6 +2,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import heapq
 from itertools import islice
 
 
@@ -21,7 +22,7 @@ def split_evenly(n, chunks):
     >>> split_evenly(35, 10)
     [4, 4, 4, 4, 4, 3, 3, 3, 3, 3]
 
-    >>> split_evenly(1, 2)
+    >>> split_evenly(1, 2)  # doctest: +IGNORE_EXCEPTION_DETAIL
     Traceback (most recent call last):
         ...
     ChunkingError: Number of chunks is greater than number
@@ -29,23 +30,124 @@ def split_evenly(n, chunks):
     """
     if n < chunks:
         raise ChunkingError("Number of chunks is greater than number")
-    if n % chunks == 0:
-        # Either we can evenly split or only 1 chunk left
-        return [n // chunks] * chunks
-    # otherwise the current chunk should be a bit larger
-    max_size = n // chunks + 1
-    return [max_size] + split_evenly(n - max_size, chunks - 1)
+    # The first `remainder` chunks are one larger than the others
+    size, remainder = divmod(n, chunks)
+    return [size + 1] * remainder + [size] * (chunks - remainder)
+
+
+def chunk_bounds(n, this_chunk, chunks):
+    """Return the (start, end) indices of one chunk, in constant time
+
+    Chunks are numbered from 1 and match `split_evenly`.
+
+    >>> chunk_bounds(35, 6, 10)
+    (20, 23)
+
+    >>> chunk_bounds(7, 4, 3)  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    ChunkingError: this_chunk is greater than total chunks
+
+    """
+    if n < chunks:
+        raise ChunkingError("Number of chunks is greater than number")
+    if not 1 <= this_chunk <= chunks:
+        raise ChunkingError("this_chunk is greater than total chunks")
+    size, remainder = divmod(n, chunks)
+    index = this_chunk - 1
+    start = index * size + min(index, remainder)
+    return start, start + size + (1 if index < remainder else 0)
+
+
+def chunk_boundaries(n, chunks):
+    """Yield the (start, end) indices of every chunk, in O(chunks)
+
+    >>> list(chunk_boundaries(7, 3))
+    [(0, 3), (3, 5), (5, 7)]
+
+    >>> sum(1 for _ in chunk_boundaries(10 ** 6, 10 ** 5))
+    100000
+
+    """
+    if n < chunks:
+        raise ChunkingError("Number of chunks is greater than number")
+    size, remainder = divmod(n, chunks)
+    start = 0
+    for index in range(chunks):
+        end = start + size + (1 if index < remainder else 0)
+        yield start, end
+        start = end
 
 
 def chunkify(things, this_chunk, chunks):
     if this_chunk > chunks:
         raise ChunkingError("this_chunk is greater than total chunks")
 
-    dist = split_evenly(len(things), chunks)
-    start = sum(dist[:this_chunk-1])
-    end = start + dist[this_chunk-1]
+    start, end = chunk_bounds(len(things), this_chunk, chunks)
 
     try:
         return things[start:end]
     except TypeError:
         return islice(things, start, end)
+
+
+def iter_chunks(things, chunks, length=None):
+    """Yield every chunk of `things` as a list, consuming it only once
+
+    `things` can be any iterable. Its length is needed to size the chunks:
+    pass `length` to avoid reading a generator into memory first.
+
+    >>> list(iter_chunks(range(7), 3))
+    [[0, 1, 2], [3, 4], [5, 6]]
+
+    >>> list(iter_chunks((str(i) for i in range(5)), 2, length=5))
+    [['0', '1', '2'], ['3', '4']]
+
+    """
+    if length is None:
+        try:
+            length = len(things)
+        except TypeError:
+            things = list(things)
+            length = len(things)
+
+    iterator = iter(things)
+    for start, end in chunk_boundaries(length, chunks):
+        yield list(islice(iterator, end - start))
+
+
+def chunkify_weighted(things, chunks, weights, default_weight=1):
+    """Split things into chunks of similar total weight
+
+    Uses the longest-processing-time-first heuristic: the heaviest remaining
+    thing always goes to the lightest chunk. Things missing from `weights`
+    weigh `default_weight`. Each chunk keeps the order of `things`.
+
+    >>> chunkify_weighted(["a", "b", "c", "d"], 2, {"a": 5, "b": 4, "c": 3, "d": 2})
+    [['a', 'd'], ['b', 'c']]
+
+    >>> chunkify_weighted(["a", "b", "c"], 2, {"a": 10}, default_weight=4)
+    [['a'], ['b', 'c']]
+
+    >>> chunkify_weighted(["a"], 2, {})  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+        ...
+    ChunkingError: Number of chunks is greater than number
+
+    """
+    things = list(things)
+    if len(things) < chunks:
+        raise ChunkingError("Number of chunks is greater than number")
+
+    order = {thing: index for index, thing in enumerate(things)}
+    heaviest_first = sorted(things, key=lambda thing: (-weights.get(thing, default_weight), order[thing]))
+
+    # (total weight, chunk index) of every chunk, the index breaking ties deterministically
+    loads = [(0, index) for index in range(chunks)]
+    result = [[] for _ in range(chunks)]
+    for thing in heaviest_first:
+        load, index = heapq.heappop(loads)
+        result[index].append(thing)
+        heapq.heappush(loads, (load + weights.get(thing, default_weight), index))
+
+    return [sorted(chunk, key=order.get) for chunk in result]
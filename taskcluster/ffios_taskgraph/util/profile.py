@@ -0,0 +1,195 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Times the loader and each transform of every kind during graph generation.
+
+Transforms are generators pulling tasks from the previous one, so the time
+spent in a transform excludes the time its upstream transforms (and the
+loader) took to produce the tasks it consumed.
+
+Turn it on with `FFIOS_TASKGRAPH_PROFILE=<path>`: the report is written there
+when the process exits, as JSON or, if the path ends with `.folded`, as
+collapsed stacks for flamegraph.pl or speedscope.
+
+Taskgraph has no hook for this: `Kind._get_loader` is wrapped and
+`TransformSequence.__call__` replaced, so profiling refuses to run on the
+taskgraph versions they weren't checked against.
+"""
+
+import atexit
+import json
+import time
+
+from taskgraph import __version__ as taskgraph_version
+from taskgraph.generator import Kind
+from taskgraph.transforms.base import TransformSequence, ValidateSchema
+
+# Major versions of taskgraph whose Kind._get_loader and
+# TransformSequence.__call__ match what enable_profiling() patches
+SUPPORTED_TASKGRAPH_VERSIONS = (9,)
+
+
+class Stage:
+    """One loader or transform of a kind."""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.seconds = 0.0
+        self.child_seconds = 0.0
+        self.tasks_in = 0
+        self.tasks_out = 0
+
+    def to_json(self):
+        return {
+            "kind": self.kind,
+            "stage": self.name,
+            "seconds": round(self.seconds - self.child_seconds, 6),
+            "tasks_in": self.tasks_in,
+            "tasks_out": self.tasks_out,
+        }
+
+
+class Profile:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = []
+        self._running = []
+
+    def stage(self, kind, name):
+        stage = Stage(kind, name)
+        self.stages.append(stage)
+        return stage
+
+    def iterate(self, stage, items):
+        while True:
+            self._running.append(stage)
+            start = self.clock()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                elapsed = self.clock() - start
+                self._running.pop()
+                stage.seconds += elapsed
+                if self._running:
+                    self._running[-1].child_seconds += elapsed
+            stage.tasks_out += 1
+            yield item
+
+    def timed_call(self, stage, func, *args):
+        # Time spent before returning the generator, e.g. a loader computing chunks
+        self._running.append(stage)
+        start = self.clock()
+        try:
+            return func(*args)
+        finally:
+            elapsed = self.clock() - start
+            self._running.pop()
+            stage.seconds += elapsed
+            if self._running:
+                self._running[-1].child_seconds += elapsed
+
+    def to_json(self):
+        return [stage.to_json() for stage in self.stages]
+
+    def to_folded(self):
+        lines = []
+        for stage in self.stages:
+            microseconds = int((stage.seconds - stage.child_seconds) * 1e6)
+            if microseconds > 0:
+                lines.append(f"{stage.kind};{stage.name} {microseconds}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as f:
+            if path.endswith(".folded"):
+                f.write(self.to_folded())
+            else:
+                json.dump(self.to_json(), f, indent=2)
+
+
+class _CountingIterator:
+    """Counts the tasks a stage pulls from upstream."""
+
+    def __init__(self, stage, items):
+        self.stage = stage
+        self.items = iter(items)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self.items)
+        self.stage.tasks_in += 1
+        return item
+
+
+def _stage_name(transform, position):
+    if isinstance(transform, ValidateSchema):
+        return f"{position:02d} validate-schema"
+    return f"{position:02d} {transform.__module__}:{transform.__qualname__}"
+
+
+_profile = None
+
+
+def enable_profiling(path=None):
+    """Profile every graph generation of this process, and write the report to
+    `path`, if any, when it exits. Returns the Profile."""
+    global _profile
+    if _profile is not None:
+        return _profile
+
+    major_version = int(taskgraph_version.split(".")[0])
+    if major_version not in SUPPORTED_TASKGRAPH_VERSIONS:
+        raise Exception(
+            f"Profiling patches taskgraph internals and wasn't checked against taskgraph "
+            f"{taskgraph_version}, update ffios_taskgraph.util.profile first"
+        )
+
+    profile = _profile = Profile()
+    original_call = TransformSequence.__call__
+    original_get_loader = Kind._get_loader
+    positions = {}
+
+    def __call__(self, config, items):
+        for transform in self._transforms:
+            if isinstance(transform, TransformSequence):
+                items = transform(config, items)
+                continue
+
+            position = positions[config.kind] = positions.get(config.kind, 0) + 1
+            stage = profile.stage(config.kind, _stage_name(transform, position))
+            items = transform(config, _CountingIterator(stage, items))
+            if items is None:
+                raise Exception(f"Transform {transform} is not a generator")
+            items = profile.iterate(stage, iter(items))
+        return items
+
+    def _get_loader(kind):
+        loader = original_get_loader(kind)
+
+        def profiled_loader(kind_name, path, config, params, loaded_tasks):
+            positions[kind_name] = 0
+            stage = profile.stage(kind_name, f"00 {loader.__module__}:{loader.__qualname__}")
+            inputs = profile.timed_call(stage, loader, kind_name, path, config, params, loaded_tasks)
+            return profile.iterate(stage, iter(inputs))
+
+        return profiled_loader
+
+    TransformSequence.__call__ = __call__
+    Kind._get_loader = _get_loader
+
+    def disable():
+        global _profile
+        TransformSequence.__call__ = original_call
+        Kind._get_loader = original_get_loader
+        _profile = None
+
+    profile.disable = disable
+    if path:
+        atexit.register(profile.write, path)
+    return profile
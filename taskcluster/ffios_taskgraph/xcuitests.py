@@ -0,0 +1,95 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+import re
+
+# Attributes and the modifiers XCTest still finds methods with, e.g.
+# `@MainActor override func testFoo()`. Private methods are left out: XCTest
+# doesn't see them.
+DECLARATION_PREFIX = (
+    r"^\s*(?:@\w+(?:\([^)]*\))?\s+)*"
+    r"(?:(?:final|internal|nonisolated|open|override|public)\s+)*"
+)
+CLASS_DECLARATION = re.compile(DECLARATION_PREFIX + r"class\s+(\w+)\s*:")
+TEST_DECLARATION = re.compile(DECLARATION_PREFIX + r"func\s+(test\w*)\s*\(\s*\)")
+
+
+# path -> (st_mtime_ns, parsed content), like LocaleRegistry only reading
+# files again once they changed
+_test_plans = {}
+_source_tests = {}
+
+
+def get_test_identifiers(test_plan, target=None, sources_dir=None):
+    """Return the identifiers of the tests a test plan runs, sorted, in the
+    `Target/Class/testMethod` form `xcodebuild -only-testing` expects.
+
+    Tests listed in `selectedTests` are used as is. Otherwise, every test
+    method found in the sources of the target (by default, the directory named
+    after it next to the test plan) is run, minus the `skippedTests`.
+
+    The test plan and the sources are only read again once their modification
+    time changes.
+    """
+    plan = _read_if_changed(_test_plans, test_plan, _read_test_plan)
+
+    identifiers = []
+    for test_target in plan["testTargets"]:
+        name = test_target["target"]["name"]
+        if target and name != target:
+            continue
+
+        if "selectedTests" in test_target:
+            tests = {_strip_parentheses(test) for test in test_target["selectedTests"]}
+        else:
+            skipped = {_strip_parentheses(test) for test in test_target.get("skippedTests", [])}
+            tests = {
+                test
+                for test in _find_tests(sources_dir or os.path.join(os.path.dirname(test_plan), name))
+                if test not in skipped and test.split("/")[0] not in skipped
+            }
+        identifiers.extend(f"{name}/{test}" for test in tests)
+
+    return sorted(identifiers)
+
+
+def _strip_parentheses(test):
+    return test[:-2] if test.endswith("()") else test
+
+
+def _read_if_changed(cache, path, read):
+    mtime = os.stat(path).st_mtime_ns
+    cached = cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = cache[path] = (mtime, read(path))
+    return cached[1]
+
+
+def _read_test_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _find_tests(sources_dir):
+    for root, _, files in os.walk(sources_dir):
+        for file in files:
+            if file.endswith(".swift"):
+                yield from _read_if_changed(_source_tests, os.path.join(root, file), _read_tests)
+
+
+def _read_tests(path):
+    tests = []
+    current_class = None
+    with open(path) as f:
+        for line in f:
+            match = CLASS_DECLARATION.match(line)
+            if match:
+                current_class = match.group(1)
+                continue
+            match = TEST_DECLARATION.match(line)
+            if match and current_class:
+                tests.append(f"{current_class}/{match.group(1)}")
+    return tests
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Times the chunking helpers of ffios_taskgraph.util.chunkify on large inputs."""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+from ffios_taskgraph.util.chunkify import chunk_boundaries, chunkify, iter_chunks, split_evenly  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the chunking helpers on large inputs.")
+    parser.add_argument("--things", type=int, default=100000, help="number of things to chunk")
+    parser.add_argument("--chunks", type=int, default=5000, help="number of chunks")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    things = [f"test-{i}" for i in range(args.things)]
+    cases = {
+        "split_evenly": lambda: split_evenly(args.things, args.chunks),
+        "chunk_boundaries": lambda: list(chunk_boundaries(args.things, args.chunks)),
+        "chunkify (every chunk)": lambda: [chunkify(things, c, args.chunks) for c in range(1, args.chunks + 1)],
+        "iter_chunks": lambda: list(iter_chunks(iter(things), args.chunks, length=args.things)),
+    }
+
+    print(f"{args.things} things in {args.chunks} chunks, best of {args.repeat}:")
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print(f"  {name:<24} {best * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
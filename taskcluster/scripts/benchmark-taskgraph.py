@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""Times the generation of the full task graph for the test parameters, offline,
+and reports the loaders and transforms it spent the most time in."""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+TASKCLUSTER_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+sys.path.insert(0, TASKCLUSTER_DIR)
+
+from taskgraph.generator import TaskGraphGenerator  # noqa: E402
+from taskgraph.parameters import parameters_loader  # noqa: E402
+
+from ffios_taskgraph.util.profile import enable_profiling  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the generation of the full task graph.")
+    parser.add_argument("parameters", nargs="*", help="parameters files (default: taskcluster/test/params/*.yml)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="number of stages to report")
+    parser.add_argument("--profile", help="also write the profile of every generation to this file (.json or .folded)")
+    args = parser.parse_args()
+
+    parameters_files = args.parameters or sorted(glob.glob(os.path.join(TASKCLUSTER_DIR, "test", "params", "*.yml")))
+    # Graph generation expects to run from the root of the repository
+    os.chdir(os.path.dirname(TASKCLUSTER_DIR))
+
+    profile = enable_profiling(args.profile)
+    for parameters_file in parameters_files:
+        timings = []
+        for _ in range(args.repeat):
+            generator = TaskGraphGenerator(
+                root_dir="taskcluster",
+                parameters=parameters_loader(parameters_file, strict=False),
+            )
+            start = time.perf_counter()
+            number_of_tasks = len(generator.full_task_graph.tasks)
+            timings.append(time.perf_counter() - start)
+        print(
+            f"{os.path.basename(parameters_file):<32} {number_of_tasks:4} tasks, "
+            f"best of {args.repeat}: {min(timings) * 1000:8.2f} ms"
+        )
+
+    totals = {}
+    for stage in profile.to_json():
+        key = (stage["kind"], stage["stage"])
+        totals[key] = totals.get(key, 0) + stage["seconds"]
+
+    print(f"\nSlowest stages over {args.repeat * len(parameters_files)} generations:")
+    for (kind, stage), seconds in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {seconds * 1000:8.2f} ms  {kind:<24} {stage}")
+
+
+if __name__ == "__main__":
+    main()
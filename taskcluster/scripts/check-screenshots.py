@@ -6,6 +6,7 @@
 
 import argparse
 import glob
+import json
 import logging
 import sys
 import yaml
@@ -22,9 +23,13 @@ def main():
 
     parser.add_argument("--artifacts-directory", required=True, help="The directory containing the zip archives to look into")
     parser.add_argument("--screenshots-configuration", type=argparse.FileType("r"), required=True, help="YAML file that contains the number of screenshots to expect as well as exceptions/")
-    parser.add_argument("--importLocales", dest="locales", metavar="LOCALE", action="append", required=True, help="locale that must be present(can be repeated)")
+    locales = parser.add_mutually_exclusive_group(required=True)
+    locales.add_argument("--importLocales", dest="locales", metavar="LOCALE", action="append", help="locale that must be present(can be repeated)")
+    locales.add_argument("--locales-manifest", type=argparse.FileType("r"), help="JSON manifest of the locales that must be present, as written by `python -m ffios_taskgraph.screenshots_locales`")
 
     result = parser.parse_args()
+    if result.locales_manifest:
+        result.locales = json.load(result.locales_manifest)["locales"]
 
     number_of_screenshots_per_locale = _parse_screenshots_configuration(result.screenshots_configuration)
     _check_files(result.artifacts_directory, result.locales, number_of_screenshots_per_locale)
@@ -0,0 +1,11 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import os
+import sys
+
+here = os.path.dirname(os.path.realpath(__file__))
+
+# Make ffios_taskgraph importable without installing it, like `taskgraph` does
+sys.path.insert(0, os.path.dirname(here))
@@ -0,0 +1,83 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from ffios_taskgraph.job import (
+    MAX_COMMAND_LENGTH,
+    REFERENCE_HEADROOM,
+    _convert_commands_to_string,
+    _generate_secret_command,
+    _inject_secrets_scopes,
+    _quote_command,
+)
+
+SECRET = {"name": "project/mobile/firefox-ios/level-3/secrets", "key": "token", "path": ".token"}
+
+
+def test_quotes_and_joins_commands():
+    command = _convert_commands_to_string([["echo", "hello world"], ["ls", "-l"]])
+
+    assert command == "echo 'hello world' && ls -l"
+
+
+@pytest.mark.parametrize("reference", ["artifact-reference", "task-reference"])
+def test_keeps_references(reference):
+    command = _convert_commands_to_string([["curl", {reference: "<build/public/a b>"}]])
+
+    assert command == {reference: "curl '<build/public/a b>'"}
+
+
+def test_refuses_both_kinds_of_references():
+    with pytest.raises(NotImplementedError):
+        _convert_commands_to_string(
+            [["curl", {"artifact-reference": "<a>"}], ["curl", {"task-reference": "<b>"}]]
+        )
+
+
+def test_refuses_commands_over_the_worker_limit():
+    with pytest.raises(ValueError, match="The command of my-task is"):
+        _convert_commands_to_string([["echo", "a" * MAX_COMMAND_LENGTH]], label="my-task")
+
+
+def test_leaves_room_for_resolved_references():
+    reference = {"artifact-reference": "<build/public/a.zip>"}
+    unresolved_length = len(_convert_commands_to_string([["curl", "a", reference]])["artifact-reference"])
+    padding = "a" * (MAX_COMMAND_LENGTH - unresolved_length - REFERENCE_HEADROOM + 1)
+
+    assert "artifact-reference" in _convert_commands_to_string([["curl", padding, reference]])
+    with pytest.raises(ValueError, match="each of its 1 unresolved reference"):
+        _convert_commands_to_string([["curl", padding + "a", reference]], label="my-task")
+
+
+def test_quotes_each_distinct_command_once():
+    _quote_command.cache_clear()
+    shared = [["python3", "taskcluster/scripts/get-secret.py", "-s", SECRET["name"]], ["cd", "firefox-ios"]]
+
+    for chunk in range(100):
+        _convert_commands_to_string(shared + [["./run.sh", f"--chunk={chunk}"]])
+
+    # The two shared commands, then one per chunk, however many tasks share them
+    assert _quote_command.cache_info().misses == 2 + 100
+    assert _quote_command.cache_info().hits == 2 * 99
+
+
+def test_generates_secret_commands():
+    command = _generate_secret_command(dict(SECRET, json=True))
+
+    assert command == [
+        "python3", "taskcluster/scripts/get-secret.py",
+        "-s", SECRET["name"], "-k", "token", "-f", ".token", "--json",
+    ]
+    command.append("mutated")
+    assert _generate_secret_command(dict(SECRET, json=True))[-1] == "--json"
+
+
+def test_does_not_duplicate_scopes():
+    other_secret = dict(SECRET, name="project/mobile/firefox-ios/level-3/other")
+    taskdesc = {"scopes": ["secrets:get:" + SECRET["name"]]}
+
+    _inject_secrets_scopes({"secrets": [SECRET, other_secret, other_secret]}, taskdesc)
+
+    assert taskdesc["scopes"] == ["secrets:get:" + SECRET["name"], "secrets:get:" + other_secret["name"]]
@@ -0,0 +1,87 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import doctest
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from taskgraph.optimize.base import registry
+from taskgraph.util.path import match
+
+from ffios_taskgraph import optimize
+from ffios_taskgraph.optimize import SkipUnlessChanged, compile_patterns
+
+PATTERNS = [
+    "",
+    "bitrise.yml",
+    "firefox-ios/**",
+    "firefox-ios/**/*.swift",
+    "**/Package.resolved",
+    "taskcluster/*/kind.yml",
+    "focus-ios/Blockzilla",
+    "*.md",
+]
+PATHS = [
+    "bitrise.yml",
+    "README.md",
+    "Package.resolved",
+    "firefox-ios/Client/AppDelegate.swift",
+    "firefox-ios/Client.xcodeproj/project.pbxproj",
+    "focus-ios/Blockzilla/AppDelegate.swift",
+    "focus-ios/BlockzillaTests/Test.swift",
+    "focus-ios/Blockzilla.xcodeproj/project.pbxproj",
+    "taskcluster/kinds/kind.yml",
+    "taskcluster/kinds/build/kind.yml",
+    "BrowserKit/Package.resolved",
+]
+
+
+def test_doctests():
+    failures, _ = doctest.testmod(optimize)
+    assert failures == 0
+
+
+@pytest.mark.parametrize("pattern,path", list(itertools.product(PATTERNS, PATHS)))
+def test_matches_like_taskgraph(pattern, path):
+    assert bool(compile_patterns((pattern,)).match(path)) == match(path, pattern)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_matches_any_pattern(path):
+    patterns = ("firefox-ios/**/*.swift", "**/Package.resolved", "*.md")
+
+    assert bool(compile_patterns(patterns).match(path)) == any(match(path, p) for p in patterns)
+
+
+def make_params(files_changed, tasks_for="github-push"):
+    return {
+        "tasks_for": tasks_for,
+        "repository_type": "git",
+        "base_rev": "",
+        "files_changed": files_changed,
+    }
+
+
+TASK = SimpleNamespace(label="generate-screenshots-1")
+
+
+def test_skips_pushes_not_touching_the_patterns():
+    strategy = SkipUnlessChanged()
+
+    assert strategy.should_remove_task(TASK, make_params(["README.md"]), ["firefox-ios/**"])
+    assert not strategy.should_remove_task(
+        TASK, make_params(["README.md", "firefox-ios/Client/Info.plist"]), ["firefox-ios/**"]
+    )
+
+
+@pytest.mark.parametrize("tasks_for", ["cron", "action"])
+def test_never_skips_cron_and_actions(tasks_for):
+    params = make_params([], tasks_for=tasks_for)
+
+    assert not SkipUnlessChanged().should_remove_task(TASK, params, ["firefox-ios/**"])
+
+
+def test_replaces_the_taskgraph_strategy():
+    assert isinstance(registry["skip-unless-changed"], SkipUnlessChanged)
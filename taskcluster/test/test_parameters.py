@@ -0,0 +1,42 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import subprocess
+
+import pytest
+
+from ffios_taskgraph.parameters import get_changed_files, get_decision_parameters
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    def git(*args):
+        return subprocess.check_output(["git", *args], cwd=tmp_path, text=True).strip()
+
+    git("init", "-q")
+    git("-c", "user.name=a", "-c", "user.email=a@example.com", "commit", "-q", "--allow-empty", "-m", "Bug 1 - First")
+    monkeypatch.chdir(tmp_path)
+    return git
+
+
+def test_reads_the_commit_message_of_the_head_revision(repo, monkeypatch):
+    head_rev = repo("rev-parse", "HEAD")
+    repo("-c", "user.name=a", "-c", "user.email=a@example.com", "commit", "-q", "--allow-empty", "-m", "Bug 2 - Second")
+    monkeypatch.delenv("MOBILE_PULL_REQUEST_NUMBER", raising=False)
+
+    parameters = {"head_rev": head_rev}
+    get_decision_parameters({}, parameters)
+
+    assert parameters["commit_message"].strip() == "Bug 1 - First"
+    assert parameters["pull_request_number"] is None
+
+
+def test_indexes_changed_files_once_per_list_of_files():
+    parameters = {"head_rev": "a" * 40, "base_rev": "b" * 40, "files_changed": ["README.md"]}
+
+    assert get_changed_files(parameters) is get_changed_files(dict(parameters, files_changed=["README.md"]))
+    # Same revisions, e.g. parameters edited by hand or an action task
+    changed = get_changed_files(dict(parameters, files_changed=["bitrise.yml"]))
+    assert changed.files == {"bitrise.yml"}
+    assert get_changed_files(parameters) is not changed
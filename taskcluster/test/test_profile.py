@@ -0,0 +1,105 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from taskgraph.transforms.base import TransformSequence
+
+from ffios_taskgraph.util import profile as profile_module
+from ffios_taskgraph.util.profile import enable_profiling
+
+
+class FakeClock:
+    """Time only goes by when a stage sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+clock = FakeClock()
+
+
+@pytest.fixture
+def profile():
+    profile = enable_profiling()
+    profile.clock = clock
+    yield profile
+    profile.disable()
+
+
+def slow_loader(duration):
+    for i in range(4):
+        clock.sleep(duration)
+        yield {"name": str(i)}
+
+
+def make_transforms():
+    first = TransformSequence()
+
+    @first.add
+    def keep_even(config, tasks):
+        for task in tasks:
+            if int(task["name"]) % 2 == 0:
+                yield task
+
+    second = TransformSequence()
+
+    @second.add
+    def slow_down(config, tasks):
+        for task in tasks:
+            clock.sleep(0.02)
+            yield task
+
+    outer = TransformSequence()
+    outer.add(first)
+    outer.add(second)
+    return outer
+
+
+def test_times_each_transform_and_counts_tasks(profile):
+    config = SimpleNamespace(kind="generate-screenshots")
+    # Like Kind._get_loader does once profiling is enabled
+    inputs = profile.iterate(profile.stage(config.kind, "00 loader"), slow_loader(0.01))
+
+    tasks = list(make_transforms()(config, inputs))
+
+    assert len(tasks) == 2
+    loader, keep_even, slow_down = profile.to_json()
+    assert loader["tasks_out"] == 4
+    assert loader["seconds"] == pytest.approx(0.04)
+    assert keep_even["stage"].endswith("keep_even")
+    assert (keep_even["tasks_in"], keep_even["tasks_out"]) == (4, 2)
+    assert (slow_down["tasks_in"], slow_down["tasks_out"]) == (2, 2)
+    # The time spent in the loader isn't counted in keep_even, nor keep_even's in slow_down
+    assert keep_even["seconds"] == pytest.approx(0)
+    assert slow_down["seconds"] == pytest.approx(0.04)
+
+
+def test_writes_json_and_folded_reports(profile, tmp_path):
+    list(make_transforms()(SimpleNamespace(kind="build"), slow_loader(0)))
+
+    profile.write(str(tmp_path / "profile.json"))
+    profile.write(str(tmp_path / "profile.folded"))
+
+    assert len(json.loads((tmp_path / "profile.json").read_text())) == 2
+    assert "build;02 test_profile:make_transforms.<locals>.slow_down " in (tmp_path / "profile.folded").read_text()
+
+
+def test_is_enabled_once(profile):
+    assert enable_profiling() is profile
+
+
+def test_refuses_unchecked_taskgraph_versions(monkeypatch):
+    monkeypatch.setattr(profile_module, "taskgraph_version", "99.0.0")
+
+    with pytest.raises(Exception, match="taskgraph 99.0.0"):
+        enable_profiling()
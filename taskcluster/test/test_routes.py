@@ -0,0 +1,61 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from types import SimpleNamespace
+
+import pytest
+
+from ffios_taskgraph.routes import SCREENSHOTS_ROUTE_TEMPLATES, add_signing_indexes
+
+HEAD_REV = "5e8c3f0d2a9b4c1e7f6a8d0b3c2e1f4a5b6c7d8e"
+
+
+def make_config(level="3"):
+    return SimpleNamespace(
+        params={"level": level, "project": "firefox-ios", "build_date": 1729296000, "head_rev": HEAD_REV},
+        graph_config={"trust-domain": "mobile"},
+    )
+
+
+def make_task(locales, routes=None):
+    task = {"label": "generate-screenshots-1", "attributes": {"chunk_locales": locales}}
+    if routes is not None:
+        task["routes"] = routes
+    return task
+
+
+def test_adds_every_template_for_every_locale():
+    task = add_signing_indexes(make_config(), make_task(["de", "fr"]))
+
+    subs = {
+        "trust-domain": "mobile",
+        "project": "firefox-ios",
+        "variant": "l10n-screenshots",
+        "build_date": "2024.10.19",
+        "head_rev": HEAD_REV,
+    }
+    assert task["routes"] == sorted(
+        tpl.format(locale=locale, **subs) for tpl in SCREENSHOTS_ROUTE_TEMPLATES for locale in ("de", "fr")
+    )
+    assert "index.mobile.v2.firefox-ios.l10n-screenshots.2024.10.19.latest.fr" in task["routes"]
+
+
+def test_keeps_existing_routes_without_duplicates():
+    existing = "index.mobile.v2.firefox-ios.l10n-screenshots.latest.de"
+    task = add_signing_indexes(make_config(), make_task(["de", "de"], routes=[existing, "custom"]))
+
+    assert task["routes"].count(existing) == 1
+    assert "custom" in task["routes"]
+    assert len(task["routes"]) == len(SCREENSHOTS_ROUTE_TEMPLATES) + 1
+
+
+def test_only_indexes_level_3():
+    task = add_signing_indexes(make_config(level="1"), make_task(["de"]))
+
+    assert "routes" not in task
+
+
+def test_refuses_tasks_with_too_many_routes():
+    with pytest.raises(Exception, match="generate-screenshots-1 would have 64 routes"):
+        add_signing_indexes(make_config(), make_task([f"l{i}" for i in range(16)]))
@@ -0,0 +1,94 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+
+import pytest
+
+from ffios_taskgraph.loader import screenshots_locales as loader_module
+from ffios_taskgraph.screenshots_locales import LocaleRegistry, get_screenshots_locales
+
+
+@pytest.fixture
+def locales_dir(tmp_path):
+    for name in ("fr.lproj", "de.lproj", "Info.plist"):
+        (tmp_path / name).mkdir()
+    return tmp_path
+
+
+def touch_dir(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_lists_lproj_locales(locales_dir):
+    assert LocaleRegistry(str(locales_dir)).get_locales() == ["de", "fr"]
+
+
+def test_lists_the_directory_only_when_it_changes(locales_dir, monkeypatch):
+    registry = LocaleRegistry(str(locales_dir))
+    registry.get_locales()
+    listdir_calls = []
+    monkeypatch.setattr(os, "listdir", lambda path: listdir_calls.append(path) or [])
+
+    registry.get_locales()
+    assert listdir_calls == []
+
+    touch_dir(locales_dir, 10 ** 18)
+    assert registry.get_locales() == []
+    assert listdir_calls == [str(locales_dir)]
+
+
+def test_sees_added_locales(locales_dir):
+    registry = LocaleRegistry(str(locales_dir))
+    registry.get_locales()
+
+    (locales_dir / "es.lproj").mkdir()
+    touch_dir(locales_dir, 10 ** 18)
+
+    assert registry.get_locales() == ["de", "es", "fr"]
+
+
+def test_round_trips_through_a_manifest(locales_dir, tmp_path):
+    manifest = str(tmp_path / "locales.json")
+    LocaleRegistry(str(locales_dir)).write_manifest(manifest)
+
+    assert LocaleRegistry.from_manifest(manifest).get_locales() == ["de", "fr"]
+
+
+def test_returns_copies(locales_dir):
+    registry = LocaleRegistry(str(locales_dir))
+    registry.get_locales().append("xx")
+
+    assert registry.get_locales() == ["de", "fr"]
+
+
+def test_finds_the_locales_of_the_tree():
+    assert "en-US" in get_screenshots_locales()
+
+
+@pytest.fixture
+def loader_locales(monkeypatch):
+    locales = ["ar", "de", "en-US", "fr", "he", "ja", "zh-CN"]
+    monkeypatch.setattr(loader_module, "get_screenshots_locales", lambda: list(locales))
+    return locales
+
+
+def load_chunks(path, config):
+    config = dict({"not-for-locales": ["en-US"], "locales-per-chunk": 3}, **config)
+    tasks = loader_module.loader("generate-screenshots", str(path), config, {}, [])
+    return {task["name"]: task["attributes"]["chunk_locales"] for task in tasks}
+
+
+def test_loader_chunks_locales_by_count(loader_locales, tmp_path):
+    assert load_chunks(tmp_path, {}) == {"1": ["ar", "de", "fr"], "2": ["he", "ja", "zh-CN"]}
+
+
+def test_loader_balances_chunks_by_weight(loader_locales, tmp_path):
+    (tmp_path / "durations.json").write_text(json.dumps({"default": 100, "locales": {"ar": 600, "de": 600}}))
+
+    chunks = load_chunks(tmp_path, {"chunk-weights": "durations.json"})
+
+    # As many chunks as without weights, but the two slow locales apart
+    assert chunks == {"1": ["ar", "fr", "ja"], "2": ["de", "he", "zh-CN"]}
@@ -0,0 +1,50 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+from taskgraph.graph import Graph
+from taskgraph.target_tasks import get_method
+from taskgraph.task import Task
+from taskgraph.taskgraph import TaskGraph
+
+from ffios_taskgraph.target_tasks import TARGET_TASK_SETS, select_tasks
+
+
+def make_graph(*tasks):
+    tasks = {
+        label: Task(kind=kind, label=label, attributes=attributes, task={})
+        for kind, label, attributes in tasks
+    }
+    return TaskGraph(tasks, Graph(set(tasks), set()))
+
+
+@pytest.fixture
+def full_task_graph():
+    return make_graph(
+        ("build", "build-screenshots", {}),
+        ("generate-screenshots", "generate-screenshots-1", {"l10n_chunk": "1"}),
+        ("generate-screenshots", "generate-screenshots-2", {"l10n_chunk": "2"}),
+        ("bitrise-performance", "bitrise-performance-tests", {}),
+        ("firebase-performance", "firebase-performance-tests", {}),
+    )
+
+
+@pytest.mark.parametrize(
+    "method,expected",
+    [
+        ("l10n_screenshots", ["generate-screenshots-1", "generate-screenshots-2"]),
+        ("bitrise_performance_test", ["bitrise-performance-tests"]),
+        ("firebase_performance_test", ["firebase-performance-tests"]),
+    ],
+)
+def test_target_task_sets(full_task_graph, method, expected):
+    assert method in TARGET_TASK_SETS
+    assert get_method(method)(full_task_graph, {}, {}) == expected
+
+
+def test_selects_by_attributes(full_task_graph):
+    labels = select_tasks(full_task_graph, ["generate-screenshots"], {"l10n_chunk": "2"})
+
+    assert labels == ["generate-screenshots-2"]
+
@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import doctest
+import itertools
+import random
+
+import pytest
+
+from ffios_taskgraph.util import chunkify as chunkify_module
+from ffios_taskgraph.util.chunkify import (
+    ChunkingError,
+    chunk_boundaries,
+    chunk_bounds,
+    chunkify,
+    chunkify_weighted,
+    iter_chunks,
+    split_evenly,
+)
+
+
+def test_doctests():
+    failures, _ = doctest.testmod(chunkify_module)
+    assert failures == 0
+
+
+@pytest.mark.parametrize("n,chunks", list(itertools.product(range(1, 25), range(1, 25))))
+def test_apis_agree(n, chunks):
+    if n < chunks:
+        with pytest.raises(ChunkingError):
+            split_evenly(n, chunks)
+        return
+
+    things = list(range(n))
+    sizes = split_evenly(n, chunks)
+    boundaries = list(chunk_boundaries(n, chunks))
+
+    assert sum(sizes) == n
+    assert max(sizes) - min(sizes) <= 1
+    assert [end - start for start, end in boundaries] == sizes
+    assert boundaries == [chunk_bounds(n, this_chunk, chunks) for this_chunk in range(1, chunks + 1)]
+    assert [chunkify(things, this_chunk, chunks) for this_chunk in range(1, chunks + 1)] == [
+        things[start:end] for start, end in boundaries
+    ]
+    assert list(iter_chunks(iter(things), chunks)) == [things[start:end] for start, end in boundaries]
+
+
+def test_chunkify_sized_iterables():
+    assert list(chunkify(dict.fromkeys("abcdefg").keys(), 2, 3)) == ["d", "e"]
+
+
+def test_thousands_of_chunks():
+    # The former recursive implementation hit the recursion limit here
+    n, chunks = 1000000, 50000
+    assert len(split_evenly(n, chunks)) == chunks
+    assert sum(1 for _ in iter_chunks(range(n), chunks)) == chunks
+    assert chunk_bounds(n, chunks, chunks) == (n - 20, n)
+
+
+def test_this_chunk_out_of_range():
+    with pytest.raises(ChunkingError):
+        chunkify(list(range(10)), 4, 3)
+    with pytest.raises(ChunkingError):
+        chunk_bounds(10, 0, 3)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunkify_weighted_balances_the_chunks(seed):
+    rng = random.Random(seed)
+    things = [f"locale-{i}" for i in range(rng.randint(10, 60))]
+    weights = {thing: rng.randint(30, 600) for thing in things if rng.random() < 0.8}
+    chunks = rng.randint(1, 10)
+
+    result = chunkify_weighted(things, chunks, weights, default_weight=120)
+
+    assert len(result) == chunks
+    assert sorted(thing for chunk in result for thing in chunk) == sorted(things)
+    for chunk in result:
+        assert chunk == [thing for thing in things if thing in chunk]
+
+    loads = [sum(weights.get(thing, 120) for thing in chunk) for chunk in result]
+    heaviest = max(weights.get(thing, 120) for thing in things)
+    # The bound of the longest-processing-time-first heuristic
+    assert max(loads) <= sum(loads) / chunks + heaviest
+    assert result == chunkify_weighted(iter(things), chunks, weights, default_weight=120)
+
+
+def test_chunkify_weighted_beats_even_chunks():
+    things = ["ar", "de", "fr", "he", "ja", "zh-CN"]
+    weights = {"ar": 600, "de": 600, "fr": 100, "he": 100, "ja": 100, "zh-CN": 100}
+
+    weighted = chunkify_weighted(things, 2, weights)
+    even = [chunkify(things, this_chunk, 2) for this_chunk in (1, 2)]
+
+    def slowest(chunks):
+        return max(sum(weights[thing] for thing in chunk) for chunk in chunks)
+
+    assert weighted == [["ar", "fr", "ja"], ["de", "he", "zh-CN"]]
+    assert slowest(weighted) == 800
+    assert slowest(even) == 1300
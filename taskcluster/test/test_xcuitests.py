@@ -0,0 +1,130 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import json
+import os
+
+import pytest
+
+from ffios_taskgraph import xcuitests
+from ffios_taskgraph.xcuitests import get_test_identifiers
+
+PROJECT_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+SOURCES = {
+    "BookmarksTests.swift": """
+class BookmarksTests: BaseTestCase {
+    override func setUp() {}
+    func testBookmark() {}
+    func testRemoveBookmark() {}
+    private func testHelper(url: String) {}
+}
+""",
+    "HistoryTests.swift": """
+final class HistoryTests: BaseTestCase {
+    func testClearHistory() {}
+    func testOpenHistory() {}
+}
+""",
+    "TabsTests.swift": """
+@MainActor
+public final class TabsTests: BaseTestCase {
+    @MainActor func testCloseTab() async throws {}
+    override public func testOpenTab() {}
+    @available(iOS 16, *) nonisolated func testShareTab() {}
+    private func testTabCount() {}
+    class func testTabsSetUp() {}
+}
+""",
+}
+
+
+@pytest.fixture
+def test_plan(tmp_path):
+    def write(test_target):
+        test_target["target"] = {"name": "XCUITests"}
+        path = tmp_path / "{}.xctestplan".format(len(list(tmp_path.glob("*.xctestplan"))))
+        path.write_text(json.dumps({"testTargets": [test_target]}))
+        return str(path)
+
+    sources = tmp_path / "XCUITests"
+    sources.mkdir()
+    for name, source in SOURCES.items():
+        (sources / name).write_text(source)
+    return write
+
+
+def test_finds_the_tests_of_the_target(test_plan):
+    assert get_test_identifiers(test_plan({})) == [
+        "XCUITests/BookmarksTests/testBookmark",
+        "XCUITests/BookmarksTests/testRemoveBookmark",
+        "XCUITests/HistoryTests/testClearHistory",
+        "XCUITests/HistoryTests/testOpenHistory",
+        "XCUITests/TabsTests/testCloseTab",
+        "XCUITests/TabsTests/testOpenTab",
+        "XCUITests/TabsTests/testShareTab",
+    ]
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        ("    func testFoo() {", "testFoo"),
+        ("    @MainActor func testFoo() async {", "testFoo"),
+        ("    @available(iOS 16, *)  override func testFoo() throws {", "testFoo"),
+        ("    override public func testFoo() {", "testFoo"),
+        ("    private func testFoo() {", None),
+        ("    fileprivate func testFoo() {", None),
+        ("    class func testFoo() {", None),
+        ("    func testFoo(_ url: String) {", None),
+        ("    func helper() {", None),
+    ],
+)
+def test_finds_test_declarations(line, expected):
+    match = xcuitests.TEST_DECLARATION.match(line)
+    assert (match.group(1) if match else None) == expected
+
+
+def test_leaves_out_skipped_tests_and_classes(test_plan):
+    plan = test_plan({"skippedTests": ["BookmarksTests", "TabsTests", "HistoryTests/testOpenHistory()"]})
+
+    assert get_test_identifiers(plan) == ["XCUITests/HistoryTests/testClearHistory"]
+
+
+def test_only_runs_selected_tests(test_plan):
+    plan = test_plan({"selectedTests": ["HistoryTests/testOpenHistory()"]})
+
+    assert get_test_identifiers(plan) == ["XCUITests/HistoryTests/testOpenHistory"]
+
+
+def test_finds_the_tests_of_the_tree():
+    tests = get_test_identifiers(
+        os.path.join(PROJECT_DIR, "firefox-ios/firefox-ios-tests/Tests/Smoketest1.xctestplan")
+    )
+
+    assert tests
+    assert all(test.startswith("XCUITests/") for test in tests)
+
+
+def test_only_reads_changed_sources_again(test_plan, tmp_path, monkeypatch):
+    plan = test_plan({})
+    get_test_identifiers(plan)
+    read = []
+    original_read_tests = xcuitests._read_tests
+
+    def read_tests(path):
+        read.append(os.path.basename(path))
+        return original_read_tests(path)
+
+    monkeypatch.setattr(xcuitests, "_read_tests", read_tests)
+    assert len(get_test_identifiers(plan)) == 7
+    assert read == []
+
+    history = tmp_path / "XCUITests" / "HistoryTests.swift"
+    history.write_text(SOURCES["HistoryTests.swift"].replace("func testOpenHistory", "func testSearchHistory"))
+    mtime = os.stat(history).st_mtime_ns + 1_000_000_000
+    os.utime(history, ns=(mtime, mtime))
+
+    assert "XCUITests/HistoryTests/testSearchHistory" in get_test_identifiers(plan)
+    assert read == ["HistoryTests.swift"]
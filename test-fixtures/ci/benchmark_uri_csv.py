@@ -0,0 +1,113 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Compares the startup time and peak memory of parsing the IANA URI schemes CSV with the
+`csv` module (what uri_update.py does) and with pandas (what it used to do).
+
+Each parser runs in a fresh interpreter, so the import cost is part of the measure.
+pandas is only needed to run this benchmark, not uri_update.py.
+
+Usage:
+    python benchmark_uri_csv.py [--csv path/to/uri-schemes-1.csv] [--runs 5]
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+
+PARSERS = {
+    "csv": """
+from uri_update import parse_uri_csv
+with open(CSV_PATH, newline="") as f:
+    schemes = parse_uri_csv(f)
+""",
+    "pandas": """
+import pandas as pd
+df = pd.read_csv(CSV_PATH)
+filtered_df = df[
+    (df["Status"] == "Permanent")
+    & (~df["URI Scheme"].str.contains("OBSOLETE", na=False))
+]
+schemes = filtered_df["URI Scheme"].dropna().sort_values().tolist()
+""",
+}
+
+RUNNER = """
+import json, resource, sys
+CSV_PATH = sys.argv[1]
+{parser}
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in bytes on macOS and in kilobytes on Linux
+peak_kb = peak // 1024 if sys.platform == "darwin" else peak
+print(json.dumps({{"peak_kb": peak_kb, "schemes": schemes}}))
+"""
+
+
+def run_parser(name, csv_path):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(parser=PARSERS[name]), csv_path],
+        cwd=CURRENT_DIR,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    output = json.loads(result.stdout)
+    return elapsed, output["peak_kb"], output["schemes"]
+
+
+def download_csv():
+    from uri_update import CONFIG, create_uri_session
+
+    with create_uri_session() as session:
+        response = session.get(CONFIG["URI_WEBSITE"])
+        response.raise_for_status()
+    with tempfile.NamedTemporaryFile("wb", suffix=".csv", delete=False) as f:
+        f.write(response.content)
+    return f.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="CSV file to parse, downloaded from IANA when omitted")
+    parser.add_argument("--runs", type=int, default=5, help="number of runs for each parser")
+    args = parser.parse_args()
+
+    sys.path.insert(0, CURRENT_DIR)
+    csv_path = args.csv or download_csv()
+
+    results = {}
+    for name in PARSERS:
+        try:
+            runs = [run_parser(name, csv_path) for _ in range(args.runs)]
+        except subprocess.CalledProcessError:
+            logging.warning("Skipping the %s parser, it failed to run (is it installed?)", name)
+            continue
+        results[name] = runs
+        logging.info(
+            "%-6s median %.3fs, peak memory %.1f MB, %d schemes",
+            name,
+            statistics.median(elapsed for elapsed, _, _ in runs),
+            max(peak_kb for _, peak_kb, _ in runs) / 1024,
+            len(runs[0][2]),
+        )
+
+    if len(results) == len(PARSERS) and results["csv"][0][2] != results["pandas"][0][2]:
+        logging.error("The csv and pandas parsers disagree on the permanent URI schemes!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s-%(levelname)s: %(message)s"
+    )
+    main()
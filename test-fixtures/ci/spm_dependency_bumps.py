@@ -0,0 +1,182 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Lists the Swift Package Manager dependencies that have a newer release.
+
+Every pin of the Package.resolved files and every requirement of the
+Package.swift files in PACKAGE_FILES is read, the tags of each repository are
+listed once (concurrently, whatever the number of files pinning it), and the
+versions are compared as semver, so that e.g. 129.0 is newer than 99.0.
+
+    python test-fixtures/ci/spm_dependency_bumps.py [--json bumps.json] [--exclude URL]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import semver
+
+PACKAGE_FILES = [
+    "Package.resolved",
+    "Package.swift",
+    "BrowserKit/Package.resolved",
+    "BrowserKit/Package.swift",
+    "firefox-ios/Client.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+    "focus-ios/Blockzilla.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+    "focus-ios/BlockzillaPackage/Package.swift",
+    "SampleBrowser/SampleBrowser.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+    "SampleComponentLibraryApp/SampleComponentLibraryApp.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+]
+MAX_WORKERS = 8
+
+# A pinned version (Package.resolved) or a version requirement (Package.swift).
+# `version` is None for packages following a branch or a revision.
+Pin = namedtuple("Pin", ["url", "version", "file"])
+Bump = namedtuple("Bump", ["url", "current", "newest", "files"])
+
+PACKAGE_SWIFT_DEPENDENCY = re.compile(
+    r'\.package\(\s*(?:name:\s*"[^"]*",\s*)?url:\s*"(?P<url>[^"]+)"\s*,\s*'
+    r'(?:(?P<kind>exact|from|branch|revision)\s*:\s*|\.(?:upToNextMajor|upToNextMinor)\(\s*from:\s*|\.exact\(\s*)?'
+    r'"(?P<value>[^"]+)"'
+)
+# Only whole-line comments, URLs are full of `//`
+LINE_COMMENT = re.compile(r"^\s*//.*$", re.MULTILINE)
+
+
+def normalize_url(url):
+    url = url.strip().rstrip("/").lower()
+    return url[:-len(".git")] if url.endswith(".git") else url
+
+
+def parse_version(raw):
+    """Parses a tag or a pinned version as semver, or returns None if it isn't a release version."""
+    raw = raw.strip()
+    if raw[:1] in ("v", "V"):
+        raw = raw[1:]
+    # SPM accepts versions with missing minor and patch components
+    core = re.match(r"^[0-9.]*", raw).group(0)
+    rest = raw[len(core):]
+    parts = core.split(".") if core else []
+    if not 1 <= len(parts) <= 3 or not all(part.isdigit() for part in parts):
+        return None
+    try:
+        return semver.VersionInfo.parse(".".join(parts + ["0"] * (3 - len(parts))) + rest)
+    except ValueError:
+        return None
+
+
+def is_newer(current, candidate):
+    """True if `candidate` is a newer version than `current`, compared as semver."""
+    current_version, candidate_version = parse_version(current), parse_version(candidate)
+    if current_version is None or candidate_version is None:
+        return False
+    return candidate_version > current_version
+
+
+def read_resolved_pins(path):
+    with open(path) as f:
+        data = json.load(f)
+    # Version 1 of the format nests the pins and names the location repositoryURL
+    pins = data["object"]["pins"] if "object" in data else data["pins"]
+    return [
+        Pin(pin.get("location", pin.get("repositoryURL")), pin["state"].get("version"), path)
+        for pin in pins
+    ]
+
+
+def read_package_swift_requirements(path):
+    with open(path) as f:
+        data = LINE_COMMENT.sub("", f.read())
+    pins = []
+    for match in PACKAGE_SWIFT_DEPENDENCY.finditer(data):
+        version = None if match.group("kind") in ("branch", "revision") else match.group("value")
+        pins.append(Pin(match.group("url"), version, path))
+    return pins
+
+
+def read_pins(paths):
+    pins = []
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Skipping missing package file {path}")
+            continue
+        if os.path.basename(path) == "Package.swift":
+            pins.extend(read_package_swift_requirements(path))
+        else:
+            pins.extend(read_resolved_pins(path))
+    return pins
+
+
+def list_tags(url):
+    """Lists the tags of a repository with a single `git ls-remote`, which isn't rate limited like the GitHub API."""
+    output = subprocess.check_output(["git", "ls-remote", "--tags", "--refs", url], timeout=120)
+    return [line.split("refs/tags/", 1)[1] for line in output.decode("utf-8").splitlines() if "refs/tags/" in line]
+
+
+def fetch_newest_releases(urls, max_workers=MAX_WORKERS):
+    """Returns the newest release of each repository, looking up each of them once and concurrently."""
+    urls = sorted({normalize_url(url) for url in urls})
+
+    def newest_release(url):
+        try:
+            versions = [(parse_version(tag), tag) for tag in list_tags(url)]
+        except (OSError, subprocess.SubprocessError) as err:
+            print(f"Could not list the tags of {url}: {err}")
+            return None
+        releases = [(version, tag) for version, tag in versions if version is not None and not version.prerelease]
+        return max(releases)[1] if releases else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(urls, executor.map(newest_release, urls)))
+
+
+def compute_bumps(pins, newest_releases):
+    """Groups the pins by repository and returns a Bump for each one that is behind its newest release."""
+    by_url = {}
+    for pin in pins:
+        if pin.version is not None:
+            by_url.setdefault(normalize_url(pin.url), []).append(pin)
+
+    bumps = []
+    for url, url_pins in sorted(by_url.items()):
+        newest = newest_releases.get(url)
+        outdated = [pin for pin in url_pins if newest and is_newer(pin.version, newest)]
+        if outdated:
+            current = min((pin.version for pin in outdated), key=parse_version)
+            bumps.append(Bump(url, current, newest, sorted({pin.file for pin in outdated})))
+    return bumps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lists the SPM dependencies that have a newer release.")
+    parser.add_argument("files", nargs="*", default=PACKAGE_FILES, help="Package.resolved/Package.swift files to check")
+    parser.add_argument("--exclude", action="append", default=[], help="repository URL to ignore")
+    parser.add_argument("--json", help="also write the bumps to this JSON file")
+    args = parser.parse_args(argv)
+
+    excluded = {normalize_url(url) for url in args.exclude}
+    pins = [pin for pin in read_pins(args.files) if normalize_url(pin.url) not in excluded]
+    newest_releases = fetch_newest_releases(pin.url for pin in pins if pin.version is not None)
+    bumps = compute_bumps(pins, newest_releases)
+
+    if not bumps:
+        print("Every SPM dependency is up to date")
+    for bump in bumps:
+        print(f"{bump.url}: {bump.current} -> {bump.newest} ({', '.join(bump.files)})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([bump._asdict() for bump in bumps], f, indent=2)
+            f.write("\n")
+    return bumps
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+from fixture_server import FixtureServer
+
+here = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.realpath(os.path.join(here, "..", "..", ".."))
+
+# The updaters import vendored_sync from test-fixtures/ci, which their workflows put on PYTHONPATH
+sys.path.insert(0, os.path.dirname(here))
+
+
+def load_script(relative_path):
+    """Imports a script of the repository by path, its file name not always being a valid module name."""
+    path = os.path.join(REPO_DIR, relative_path)
+    name = "updater_" + os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def server():
+    with FixtureServer() as server:
+        yield server
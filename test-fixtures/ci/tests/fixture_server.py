@@ -0,0 +1,170 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Local HTTP server replaying recorded responses of the services our updater
+scripts talk to, so that they can be tested and benchmarked offline.
+
+Requests are routed by their first path component, the host they stand for:
+`https://hg.mozilla.org/mozilla-central/json-rev/tip` becomes
+`http://127.0.0.1:<port>/hg.mozilla.org/mozilla-central/json-rev/tip`, served
+from `recorded/hg.mozilla.org/mozilla-central/json-rev/tip`. Query strings are
+ignored, add a route for responses that depend on them.
+
+Every response can be delayed (`latency`), and any URL can be made to fail a
+given number of times before it's served (`fail()`), to exercise retries. The
+most requests waiting on that delay at once is kept in `peak_in_flight`, to
+check that a script doesn't make them one after the other.
+
+The scripts don't take a base URL, point them at it by patching their URL
+constants with `url()`, like the tests do. Run it directly to serve the recorded
+responses to something else, e.g. curl:
+
+    python fixture_server.py [--port 8000] [--latency 0.05]
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RECORDED_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "recorded")
+
+Response = namedtuple("Response", ["status", "body", "headers"])
+Request = namedtuple("Request", ["path", "query", "headers"])
+
+
+class FixtureServer:
+    def __init__(self, root=RECORDED_DIR, latency=0.0, port=0):
+        self.root = root
+        self.latency = latency
+        self.port = port
+        self.routes = {}
+        self.failures = {}
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", self.port), _handler_class(self))
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, url):
+        """Rewrites the URL of a real service to its counterpart on this server."""
+        parts = urlsplit(url)
+        rewritten = "http://127.0.0.1:{}/{}{}".format(self.port, parts.netloc, parts.path)
+        return rewritten + ("?" + parts.query if parts.query else "")
+
+    def add_route(self, url, body=b"", status=200, headers=None):
+        """
+        Serves `body` for `url` instead of the recorded response. `body` can also be a
+        callable, taking the Request and returning a Response.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.routes[_key(url)] = body if callable(body) else Response(status, body, headers or {})
+
+    def fail(self, url, *statuses):
+        """Answers the next requests for `url` with `statuses`, in order, then serves it normally."""
+        with self.lock:
+            self.failures.setdefault(_key(url), []).extend(statuses)
+
+    def requested(self, url):
+        """Returns the requests made for `url`, whatever their query string."""
+        key = _key(url)
+        with self.lock:
+            return [request for request in self.requests if request.path == key]
+
+    def respond(self, request):
+        with self.lock:
+            self.requests.append(request)
+            failures = self.failures.get(request.path)
+            status = failures.pop(0) if failures else None
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        if status is not None:
+            return Response(status, b"", {})
+
+        route = self.routes.get(request.path)
+        if callable(route):
+            return route(request)
+        if route is not None:
+            return route
+
+        path = os.path.normpath(os.path.join(self.root, request.path.lstrip("/")))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return Response(404, b"Not Found", {})
+        with open(path, "rb") as f:
+            body = f.read()
+
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        if request.headers.get("If-None-Match") == etag:
+            return Response(304, b"", {"ETag": etag})
+        return Response(200, body, {"ETag": etag})
+
+
+def _key(url):
+    parts = urlsplit(url)
+    if parts.scheme in ("http", "https") and parts.netloc and not parts.netloc.startswith("127.0.0.1"):
+        return "/" + parts.netloc + parts.path
+    return parts.path
+
+
+def _handler_class(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            request = Request(parts.path, parse_qs(parts.query), dict(self.headers))
+            status, body, headers = server.respond(request)
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the recorded responses of the updaters' services.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each response")
+    args = parser.parse_args()
+
+    with FixtureServer(latency=args.latency, port=args.port) as server:
+        print("Serving {} on http://127.0.0.1:{}/<host>/<path>".format(RECORDED_DIR, server.port))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,6 @@
+/* This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. */
+
+export const FormAutofill = {
+  isAutofillEnabled: true,
+};
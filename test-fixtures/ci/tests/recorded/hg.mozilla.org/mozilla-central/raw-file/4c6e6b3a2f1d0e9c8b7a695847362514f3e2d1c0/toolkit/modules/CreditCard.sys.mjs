@@ -0,0 +1,8 @@
+/* This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. */
+
+export class CreditCard {
+  static isValidNumber(number) {
+    return /^\d{12,19}$/.test(number);
+  }
+}
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from conftest import load_script
+
+REVISION = "4c6e6b3a2f1d0e9c8b7a695847362514f3e2d1c0"
+FILES = [
+    "toolkit/modules/CreditCard.sys.mjs",
+    "toolkit/components/formautofill/FormAutofill.sys.mjs",
+]
+
+
+@pytest.fixture
+def cc_update(server, tmp_path, monkeypatch):
+    module = load_script("firefox-ios/Client/Assets/CC_Script/CC_Python_Update.py")
+    repo_url = server.url(module.MOZILLA_CENTRAL_REPO_URL)
+    monkeypatch.setattr(module, "MOZILLA_CENTRAL_REPO_URL", repo_url)
+    monkeypatch.setattr(module, "MOZILLA_CENTRAL_URL", repo_url + "raw-file/{revision}/")
+    monkeypatch.setattr(module, "GITHUB_ACTIONS_PATH", str(tmp_path) + "/")
+    monkeypatch.setattr(module, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(module, "FILES_TO_DOWNLOAD", list(FILES))
+    monkeypatch.setattr("sys.argv", ["CC_Python_Update.py"])
+    monkeypatch.setenv("VENDORED_SYNC_CACHE", str(tmp_path / "cache.json"))
+    return module
+
+
+def checked_revision(tmp_path):
+    return json.loads((tmp_path / "cache.json").read_text())["CC_Script checked revision"]
+
+
+def set_revisions(tmp_path, revision, checked=None):
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["revision"] = revision
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    cache = json.loads((tmp_path / "cache.json").read_text())
+    cache["CC_Script checked revision"] = checked or revision
+    (tmp_path / "cache.json").write_text(json.dumps(cache))
+
+
+def raw_file_url(path):
+    return "https://hg.mozilla.org/mozilla-central/raw-file/{}/{}".format(REVISION, path)
+
+
+def test_downloads_every_file_and_pins_the_revision(cc_update, server, tmp_path):
+    cc_update.main()
+
+    assert (tmp_path / "CreditCard.sys.mjs").read_text().startswith("/* This Source Code Form")
+    assert (tmp_path / "FormAutofill.sys.mjs").exists()
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["revision"] == REVISION
+    assert sorted(manifest["files"]) == sorted(FILES)
+    assert checked_revision(tmp_path) == REVISION
+
+
+def test_skips_downloads_when_the_revision_is_pinned(cc_update, server, tmp_path):
+    cc_update.main()
+    cc_update.main()
+
+    for path in FILES:
+        assert len(server.requested(raw_file_url(path))) == 1
+
+
+def test_only_downloads_files_changed_upstream(cc_update, server, tmp_path):
+    cc_update.main()
+    set_revisions(tmp_path, "0a1b2c3d4e5f60718293a4b5c6d7e8f901234567")
+
+    cc_update.main()
+
+    # Only CreditCard.sys.mjs is touched by the recorded pushlog
+    assert len(server.requested(raw_file_url(FILES[0]))) == 2
+    assert len(server.requested(raw_file_url(FILES[1]))) == 1
+
+
+def test_advances_the_checked_revision_without_changes(cc_update, server, tmp_path):
+    cc_update.main()
+    old_revision = "0a1b2c3d4e5f60718293a4b5c6d7e8f901234567"
+    set_revisions(tmp_path, old_revision)
+    manifest = (tmp_path / "manifest.json").read_text()
+    # None of the vendored files is touched upstream
+    server.add_route(
+        "https://hg.mozilla.org/mozilla-central/json-pushes",
+        json.dumps({"lastpushid": 42, "pushes": {"42": {"changesets": [{"files": ["README.md"]}]}}}),
+    )
+
+    cc_update.main()
+
+    # Left as is, so that there is nothing to open a pull request for
+    assert (tmp_path / "manifest.json").read_text() == manifest
+    assert checked_revision(tmp_path) == REVISION
+    assert len(server.requested(raw_file_url(FILES[0]))) == 1
+
+
+def test_reads_the_pushlog_from_the_checked_revision(cc_update, server, tmp_path):
+    cc_update.main()
+    set_revisions(tmp_path, "0a1b2c3d4e5f60718293a4b5c6d7e8f901234567", "1b2c3d4e5f60718293a4b5c6d7e8f9012345678a")
+
+    cc_update.main()
+
+    [pushlog] = server.requested("https://hg.mozilla.org/mozilla-central/json-pushes")
+    assert pushlog.query["fromchange"] == ["1b2c3d4e5f60718293a4b5c6d7e8f9012345678a"]
+
+
+def test_falls_back_to_the_pinned_revision_without_a_cache(cc_update, server, tmp_path, monkeypatch):
+    cc_update.main()
+    set_revisions(tmp_path, "0a1b2c3d4e5f60718293a4b5c6d7e8f901234567", "1b2c3d4e5f60718293a4b5c6d7e8f9012345678a")
+    monkeypatch.delenv("VENDORED_SYNC_CACHE")
+
+    cc_update.main()
+
+    [pushlog] = server.requested("https://hg.mozilla.org/mozilla-central/json-pushes")
+    assert pushlog.query["fromchange"] == ["0a1b2c3d4e5f60718293a4b5c6d7e8f901234567"]
+
+
+def test_skips_files_removed_upstream(cc_update, server, tmp_path, monkeypatch):
+    monkeypatch.setattr(cc_update, "FILES_TO_DOWNLOAD", FILES + ["toolkit/modules/Removed.sys.mjs"])
+
+    cc_update.main()
+
+    assert not (tmp_path / "Removed.sys.mjs").exists()
+    assert "toolkit/modules/Removed.sys.mjs" not in json.loads((tmp_path / "manifest.json").read_text())["files"]
+
+
+def test_retries_server_errors(cc_update, server, tmp_path):
+    server.fail(raw_file_url(FILES[0]), 503)
+
+    cc_update.main()
+
+    assert len(server.requested(raw_file_url(FILES[0]))) == 2
+    assert (tmp_path / "CreditCard.sys.mjs").exists()
+
+
+def test_writes_nothing_if_a_download_fails(cc_update, server, tmp_path):
+    server.fail(raw_file_url(FILES[1]), 500, 500, 500)
+
+    with pytest.raises(SystemExit):
+        cc_update.main()
+
+    assert not (tmp_path / "CreditCard.sys.mjs").exists()
+    assert not (tmp_path / "manifest.json").exists()
+
+
+def test_downloads_concurrently(cc_update, server):
+    server.latency = 0.1
+
+    cc_update.main()
+
+    # json-rev/tip, then both files at once
+    assert server.peak_in_flight > 1
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import subprocess
+
+import pytest
+
+from conftest import load_script
+
+AURORA_URL = "https://hg.mozilla.org/releases/mozilla-aurora/"
+L10N_URL = "https://hg.mozilla.org/releases/l10n/mozilla-aurora/"
+OVERLAY = """\
+<SearchOverlay>
+  <append parent="//search:Url[@type='text/html']">
+    <Param name="client" value="firefox-b-m"/>
+  </append>
+</SearchOverlay>
+"""
+
+
+@pytest.fixture
+def search_scraper(server, tmp_path, monkeypatch):
+    module = load_script("firefox-ios/Client/Assets/Search/search_scraper.py")
+    for name in ("EN_PLUGINS_DIR_URL", "EN_PLUGINS_FILE_URL", "EN_PREFS_URL", "L10N_LOCALE_LIST_URL",
+                 "L10N_PLUGINS_DIR_URL", "L10N_PLUGINS_FILE_URL", "L10N_PREFS_URL"):
+        monkeypatch.setattr(module, name, server.url(getattr(module, name)))
+
+    # Seed the supported locales cache, so that get_supported_locales.swift never runs
+    script = b"// get_supported_locales.swift\n"
+    (tmp_path / "get_supported_locales.swift").write_bytes(script)
+    (tmp_path / "supported_locales.json").write_text(json.dumps({hashlib.sha256(script).hexdigest(): {"locales": ["en", "fr"]}}))
+    monkeypatch.setattr(module, "SUPPORTED_LOCALES_CACHE", str(tmp_path / "supported_locales.json"))
+
+    (tmp_path / "SearchOverlays").mkdir()
+    (tmp_path / "SearchOverlays" / "google.xml").write_text(OVERLAY)
+    return module
+
+
+def refresh(module, tmp_path, **fetcher_options):
+    product = module.Product("firefox", str(tmp_path), module.AllLocalesSource(), header=module.MOZ_HEADER)
+    fetcher = module.Fetcher(**fetcher_options)
+    try:
+        module.ScrapingEngine(fetcher).refresh([product])
+    finally:
+        fetcher.close()
+    return fetcher
+
+
+def test_scrapes_the_supported_locales(search_scraper, tmp_path):
+    refresh(search_scraper, tmp_path)
+
+    plugins = tmp_path / "SearchPlugins"
+    assert sorted(path.name for path in plugins.iterdir()) == ["en", "fr"]
+    assert sorted(path.name for path in (plugins / "fr").iterdir()) == ["default.txt", "google.xml", "list.txt", "qwant.xml"]
+    assert (plugins / "en" / "default.txt").read_text() == "Google"
+    assert (plugins / "fr" / "default.txt").read_text() == "Qwant"
+
+
+def test_applies_the_overlays(search_scraper, tmp_path):
+    refresh(search_scraper, tmp_path)
+
+    google = (tmp_path / "SearchPlugins" / "fr" / "google.xml").read_text()
+    assert google.startswith(search_scraper.MOZ_HEADER)
+    assert '<Param name="client" value="firefox-b-m"/>' in google
+    assert "firefox-b-m" not in (tmp_path / "SearchPlugins" / "fr" / "qwant.xml").read_text()
+
+
+def test_downloads_each_file_once(search_scraper, server, tmp_path):
+    fetcher = refresh(search_scraper, tmp_path)
+
+    paths = [request.path for request in server.requests]
+    assert len(paths) == len(set(paths)) == fetcher.downloads
+
+
+def test_reuses_the_download_cache(search_scraper, server, tmp_path):
+    refresh(search_scraper, tmp_path, cacheDir=str(tmp_path / "cache"))
+    requests = len(server.requests)
+
+    fetcher = refresh(search_scraper, tmp_path, cacheDir=str(tmp_path / "cache"))
+
+    assert fetcher.downloads == 0
+    assert len(server.requests) == requests
+
+
+def test_downloads_concurrently(search_scraper, server, tmp_path):
+    server.latency = 0.1
+
+    refresh(search_scraper, tmp_path)
+
+    # all-locales, then listings and prefs, then plugins: three rounds of requests
+    assert server.peak_in_flight > 1
+    assert len(server.requests) > 6
+
+
+def test_stops_without_swift_nor_cached_locales(search_scraper, server, tmp_path, monkeypatch):
+    (tmp_path / "get_supported_locales.swift").write_bytes(b"// changed\n")
+    (tmp_path / "SearchPlugins" / "fr").mkdir(parents=True)
+    monkeypatch.setattr(search_scraper.shutil, "which", lambda name: None)
+
+    with pytest.raises(SystemExit):
+        refresh(search_scraper, tmp_path)
+
+    assert (tmp_path / "SearchPlugins" / "fr").exists()
+
+
+def mark_approximate(tmp_path, locales):
+    path = tmp_path / "supported_locales.json"
+    cache = json.loads(path.read_text())
+    for key in cache:
+        cache[key] = {"approximate": True, "locales": locales}
+    path.write_text(json.dumps(cache))
+
+
+def test_runs_swift_instead_of_using_approximate_locales(search_scraper, tmp_path, monkeypatch):
+    mark_approximate(tmp_path, ["de", "en", "fr"])
+    monkeypatch.setattr(search_scraper.shutil, "which", lambda name: "/usr/bin/swift")
+    ran = []
+
+    def run(args, cwd, stdout, check):
+        ran.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout=b'["en", "fr"]')
+
+    monkeypatch.setattr(search_scraper.subprocess, "run", run)
+    product = search_scraper.Product("firefox", str(tmp_path), search_scraper.AllLocalesSource())
+
+    assert search_scraper.getSupportedLocales(product) == ["en", "fr"]
+    assert search_scraper.getSupportedLocales(product) == ["en", "fr"]
+    assert len(ran) == 1
+    (entry,) = json.loads((tmp_path / "supported_locales.json").read_text()).values()
+    assert "approximate" not in entry
+
+
+def test_uses_approximate_locales_without_swift(search_scraper, tmp_path, monkeypatch):
+    mark_approximate(tmp_path, ["de", "en"])
+    monkeypatch.setattr(search_scraper.shutil, "which", lambda name: None)
+    product = search_scraper.Product("firefox", str(tmp_path), search_scraper.AllLocalesSource())
+
+    assert search_scraper.getSupportedLocales(product) == ["de", "en"]
+
+
+@pytest.mark.parametrize("product", ["firefoxProduct", "focusProduct"])
+def test_supported_locales_are_checked_in(product):
+    module = load_script("firefox-ios/Client/Assets/Search/search_scraper.py")
+    product = getattr(module, product)()
+    with open(module.SUPPORTED_LOCALES_CACHE) as f:
+        cache = json.load(f)
+    with open("{}/get_supported_locales.swift".format(product.directory), "rb") as f:
+        key = hashlib.sha256(f.read()).hexdigest()
+
+    assert "en-US" in cache[key]["locales"]
+
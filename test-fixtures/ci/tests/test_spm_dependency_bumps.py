@@ -0,0 +1,198 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from conftest import REPO_DIR, load_script
+
+PACKAGE_SWIFT = """\
+// swift-tools-version:5.7
+import PackageDescription
+
+let package = Package(
+    name: "Fixture",
+    dependencies: [
+        .package(url: "https://github.com/example/exact.git", exact: "1.2.3"),
+        .package(url: "https://github.com/example/from", from: "5.0.1"),
+        .package(
+            url: "https://github.com/example/multiline.git",
+            exact: "7.11.0"),
+        .package(name: "Named", url: "https://github.com/example/named.git", from: "2.0"),
+        .package(url: "https://github.com/example/major.git", .upToNextMajor(from: "3.1.0")),
+        .package(url: "https://github.com/example/minor.git", .upToNextMinor(from: "0.9.2")),
+        .package(url: "https://github.com/example/legacy-exact.git", .exact("4.0.0")),
+        .package(url: "https://github.com/example/branch.git", branch: "main"),
+        .package(url: "https://github.com/example/revision.git", revision: "0a1b2c3d"),
+        // .package(url: "https://github.com/example/commented-out.git", exact: "1.0.0"),
+    ]
+)
+"""
+
+
+@pytest.fixture
+def bumps():
+    return load_script("test-fixtures/ci/spm_dependency_bumps.py")
+
+
+def resolved(pins, version=2):
+    if version == 1:
+        return {"object": {"pins": [{"repositoryURL": url, "state": state} for url, state in pins]}, "version": 1}
+    return {"pins": [{"location": url, "state": state} for url, state in pins], "version": 2}
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("1.2.3", "1.2.3"),
+        ("v129.0", "129.0.0"),
+        ("V7", "7.0.0"),
+        (" 8.35.0\n", "8.35.0"),
+        ("1.2.3-beta.1", "1.2.3-beta.1"),
+        ("1.0-rc1", "1.0.0-rc1"),
+        ("2.0.0+build.5", "2.0.0+build.5"),
+        ("1.2.3.4", None),
+        ("1.2.", None),
+        ("1..2", None),
+        ("release-1.0", None),
+        ("latest", None),
+        ("", None),
+        ("1.2.3-", None),
+    ],
+)
+def test_parse_version(bumps, raw, expected):
+    version = bumps.parse_version(raw)
+    assert (str(version) if version is not None else None) == expected
+
+
+@pytest.mark.parametrize(
+    "current, candidate, expected",
+    [
+        ("99.0", "129.0", True),
+        ("129.0", "99.0", False),
+        ("1.2.3", "1.2.3", False),
+        ("1.2", "v1.2.0", False),
+        ("1.0.0-beta.1", "1.0.0", True),
+        ("1.0.0", "1.0.0-rc.1", False),
+        ("1.0.0", "not-a-version", False),
+        ("main", "2.0.0", False),
+    ],
+)
+def test_is_newer(bumps, current, candidate, expected):
+    assert bumps.is_newer(current, candidate) is expected
+
+
+def test_reads_package_swift_requirements(bumps, tmp_path):
+    (tmp_path / "Package.swift").write_text(PACKAGE_SWIFT)
+
+    pins = bumps.read_package_swift_requirements(str(tmp_path / "Package.swift"))
+
+    assert [(pin.url, pin.version) for pin in pins] == [
+        ("https://github.com/example/exact.git", "1.2.3"),
+        ("https://github.com/example/from", "5.0.1"),
+        ("https://github.com/example/multiline.git", "7.11.0"),
+        ("https://github.com/example/named.git", "2.0"),
+        ("https://github.com/example/major.git", "3.1.0"),
+        ("https://github.com/example/minor.git", "0.9.2"),
+        ("https://github.com/example/legacy-exact.git", "4.0.0"),
+        ("https://github.com/example/branch.git", None),
+        ("https://github.com/example/revision.git", None),
+    ]
+
+
+def test_reads_the_checked_in_package_swift(bumps):
+    path = os.path.join(REPO_DIR, "BrowserKit", "Package.swift")
+
+    pins = {pin.url: pin.version for pin in bumps.read_package_swift_requirements(path)}
+
+    assert pins["https://github.com/onevcat/Kingfisher.git"] == "7.11.0"
+    assert pins["https://github.com/nbhasin2/Fuzi.git"] is None
+    assert pins["https://github.com/nbhasin2/GCDWebServer.git"] is None
+
+
+@pytest.mark.parametrize("version", [1, 2])
+def test_reads_resolved_pins(bumps, tmp_path, version):
+    path = tmp_path / "Package.resolved"
+    path.write_text(json.dumps(resolved(
+        [
+            ("https://github.com/example/a.git", {"version": "1.0.0", "revision": "abc"}),
+            ("https://github.com/example/b", {"branch": "main", "revision": "def"}),
+        ],
+        version,
+    )))
+
+    pins = bumps.read_resolved_pins(str(path))
+
+    assert [(pin.url, pin.version) for pin in pins] == [
+        ("https://github.com/example/a.git", "1.0.0"),
+        ("https://github.com/example/b", None),
+    ]
+
+
+def test_computes_one_bump_per_repository(bumps):
+    Pin = bumps.Pin
+    pins = [
+        Pin("https://github.com/Example/A.git", "1.2.0", "Package.resolved"),
+        Pin("https://github.com/example/a/", "1.10.0", "BrowserKit/Package.resolved"),
+        Pin("https://github.com/example/a", "2.0.0", "Package.swift"),
+        Pin("https://github.com/example/b", "99.0", "Package.resolved"),
+        Pin("https://github.com/example/c", "3.0.0", "Package.resolved"),
+        Pin("https://github.com/example/d", None, "Package.swift"),
+        Pin("https://github.com/example/e", "1.0.0", "Package.resolved"),
+    ]
+    newest = {
+        "https://github.com/example/a": "2.0.0",
+        "https://github.com/example/b": "129.0",
+        "https://github.com/example/c": "3.0.0",
+        "https://github.com/example/d": "9.0.0",
+        "https://github.com/example/e": None,
+    }
+
+    assert bumps.compute_bumps(pins, newest) == [
+        bumps.Bump("https://github.com/example/a", "1.2.0", "2.0.0", ["BrowserKit/Package.resolved", "Package.resolved"]),
+        bumps.Bump("https://github.com/example/b", "99.0", "129.0", ["Package.resolved"]),
+    ]
+
+
+def test_newest_releases_skip_pre_releases_and_malformed_tags(bumps, monkeypatch):
+    tags = {
+        "https://github.com/example/a": ["v1.9.0", "v1.10.0", "v2.0.0-beta.1", "nightly", "1.2.3.4"],
+        "https://github.com/example/b": ["latest"],
+    }
+    listed = []
+
+    def list_tags(url):
+        listed.append(url)
+        if url not in tags:
+            raise subprocess.CalledProcessError(128, ["git", "ls-remote", url])
+        return tags[url]
+
+    monkeypatch.setattr(bumps, "list_tags", list_tags)
+
+    newest = bumps.fetch_newest_releases(
+        ["https://github.com/example/a.git", "https://github.com/Example/A", "https://github.com/example/b", "https://github.com/example/gone"]
+    )
+
+    assert newest == {
+        "https://github.com/example/a": "v1.10.0",
+        "https://github.com/example/b": None,
+        "https://github.com/example/gone": None,
+    }
+    assert sorted(listed) == sorted(newest)
+
+
+def test_main_writes_the_bumps(bumps, tmp_path, monkeypatch):
+    (tmp_path / "Package.swift").write_text(PACKAGE_SWIFT)
+    tags = {"https://github.com/example/exact": ["1.2.3", "1.3.0"], "https://github.com/example/from": ["6.0.0"]}
+    monkeypatch.setattr(bumps, "list_tags", lambda url: tags.get(url, []))
+
+    result = bumps.main([
+        str(tmp_path / "Package.swift"),
+        "--exclude", "https://github.com/example/from.git",
+        "--json", str(tmp_path / "bumps.json"),
+    ])
+
+    assert [bump.url for bump in result] == ["https://github.com/example/exact"]
+    assert json.loads((tmp_path / "bumps.json").read_text()) == [
+        {"url": "https://github.com/example/exact", "current": "1.2.3", "newest": "1.3.0", "files": [str(tmp_path / "Package.swift")]}
+    ]
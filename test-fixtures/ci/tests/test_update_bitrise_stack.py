@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from conftest import REPO_DIR, load_script
+
+BITRISE_YML = """\
+format_version: '11'
+workflows:
+  Build:
+    meta:
+      bitrise.io:
+        stack: osx-xcode-15.2.x
+  NewXcodeVersions:
+    steps:
+    - script@1:
+        inputs:
+        - content: |-
+            # not a key of the workflow
+            meta:
+              bitrise.io:
+                stack: osx-xcode-14.3.x
+    description: Builds with the latest Xcode
+    meta:
+      "bitrise.io":
+        machine_type_id: g2-m1.8core
+        stack: 'osx-xcode-15.4.x'  # bumped by test-fixtures/update.py
+  L10nBuild:
+    meta:
+      bitrise.io:
+        stack: osx-xcode-15.4.x
+meta:
+  bitrise.io:
+    stack: osx-xcode-15.4.x
+"""
+TARGET_LINE = 19
+
+
+@pytest.fixture
+def update():
+    return load_script("test-fixtures/update.py")
+
+
+def stack_info(stack):
+    return json.dumps({"project_types_with_default_stacks": {"ios": {"default_stack": stack}}}).encode("utf-8")
+
+
+def changed_lines(before, after):
+    before, after = before.splitlines(True), after.splitlines(True)
+    assert len(before) == len(after)
+    return [index for index, (old, new) in enumerate(zip(before, after)) if old != new]
+
+
+@pytest.mark.parametrize(
+    "path, line",
+    [
+        (("format_version",), 0),
+        (("workflows", "Build", "meta", "bitrise.io", "stack"), 5),
+        (("workflows", "NewXcodeVersions", "meta", "bitrise.io"), 17),
+        (("workflows", "NewXcodeVersions", "meta", "bitrise.io", "stack"), TARGET_LINE),
+        (("meta", "bitrise.io", "stack"), 26),
+        (("workflows", "NewXcodeVersions", "stack"), None),
+        (("workflows", "Missing"), None),
+    ],
+)
+def test_finds_nested_keys(update, path, line):
+    assert update.find_key_line(BITRISE_YML.splitlines(True), path) == line
+
+
+def test_skips_keys_in_block_scalars(update):
+    # Without its own meta, the workflow only has the one of the script content
+    lines = BITRISE_YML.splitlines(True)
+    lines = lines[:TARGET_LINE - 3] + lines[TARGET_LINE + 1:]
+
+    assert update.find_key_line(lines, update.STACK_PATH) is None
+
+
+def test_only_rewrites_the_workflow_stack(update):
+    updated = update.update_stack(stack_info("osx-xcode-16.0.x"), BITRISE_YML.encode("utf-8"))
+
+    assert changed_lines(BITRISE_YML, updated) == [TARGET_LINE]
+    assert updated.splitlines()[TARGET_LINE] == "        stack: 'osx-xcode-16.0.x'  # bumped by test-fixtures/update.py"
+
+
+def test_keeps_line_endings(update):
+    crlf = BITRISE_YML.replace("\n", "\r\n")
+
+    updated = update.update_stack(stack_info("osx-xcode-16.0.x"), crlf.encode("utf-8"))
+
+    assert changed_lines(crlf, updated) == [TARGET_LINE]
+    assert updated.count("\r\n") == crlf.count("\r\n")
+
+
+def test_leaves_the_current_stack_alone(update):
+    assert update.update_stack(stack_info("osx-xcode-15.4.x"), BITRISE_YML.encode("utf-8")) is None
+
+
+def test_refuses_files_without_the_workflow_stack(update):
+    with pytest.raises(ValueError):
+        update.update_stack(stack_info("osx-xcode-16.0.x"), b"workflows:\n  NewXcodeVersions:\n    steps: []\n")
+
+
+def test_updates_the_checked_in_bitrise_yml(update):
+    with open(os.path.join(REPO_DIR, "bitrise.yml"), encoding="utf-8") as f:
+        current = f.read()
+    target = update.find_key_line(current.splitlines(True), update.STACK_PATH)
+
+    updated = update.update_stack(stack_info("osx-xcode-99.0.x"), current.encode("utf-8"))
+
+    assert changed_lines(current, updated) == [target]
+    assert updated.splitlines()[target].strip() == "stack: osx-xcode-99.0.x"
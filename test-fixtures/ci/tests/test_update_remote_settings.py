@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from conftest import load_script
+from fixture_server import Response
+
+COLLECTION_URL = "https://firefox.settings.services.mozilla.com/v1/buckets/main/collections/password-rules"
+
+
+@pytest.fixture
+def remote_settings(server, tmp_path, monkeypatch):
+    module = load_script("firefox-ios/Client/Assets/RemoteSettingsData/Update_Remote_Settings.py")
+    config = {
+        "rules": [
+            {
+                "name": "Password Rules",
+                "url": server.url(COLLECTION_URL + "/records"),
+                "file": str(tmp_path / "RemotePasswordRules.json"),
+                "required_fields": ["Domain", "password-rules"],
+                "min_records": 2,
+            }
+        ]
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    monkeypatch.setattr(module, "CONFIG_FILE", str(tmp_path / "config.json"))
+    monkeypatch.setattr(module, "GITHUB_ACTIONS_TMP_PATH", str(tmp_path / "tmp") + "/")
+    return module
+
+
+def read_rules(tmp_path):
+    return json.loads((tmp_path / "RemotePasswordRules.json").read_text())
+
+
+def test_writes_the_collection_sorted_by_id(remote_settings, tmp_path):
+    remote_settings.main()
+
+    rules = read_rules(tmp_path)
+    assert [rule["Domain"] for rule in rules] == ["example.org", "example.net", "example.com"]
+    meta = json.loads((tmp_path / "RemotePasswordRules.meta.json").read_text())
+    assert meta["timestamp"] == 1729296000200
+
+
+def test_skips_collections_that_did_not_change(remote_settings, server, tmp_path):
+    remote_settings.main()
+    remote_settings.main()
+
+    assert len(server.requested(COLLECTION_URL + "/changeset")) == 1
+
+
+def test_records_the_meta_of_an_unchanged_snapshot(remote_settings, server, tmp_path):
+    remote_settings.main()
+    # A snapshot committed without its meta, e.g. by hand
+    (tmp_path / "RemotePasswordRules.meta.json").unlink()
+    snapshot = (tmp_path / "RemotePasswordRules.json").read_text()
+
+    remote_settings.main()
+    remote_settings.main()
+
+    assert (tmp_path / "RemotePasswordRules.json").read_text() == snapshot
+    meta = json.loads((tmp_path / "RemotePasswordRules.meta.json").read_text())
+    assert meta["timestamp"] == 1729296000200
+    # Only the first run and the one recovering the meta fetched the collection
+    assert len(server.requested(COLLECTION_URL + "/changeset")) == 2
+
+
+def test_merges_changes_since_the_stored_timestamp(remote_settings, server, tmp_path):
+    remote_settings.main()
+
+    def changes(request):
+        assert request.query["_since"] == ['"1729296000200"']
+        body = {
+            "timestamp": 1729296000400,
+            "changes": [
+                {"id": "7f6e5d4c-3b2a-4190-8f7e-6d5c4b3a2910", "deleted": True, "last_modified": 1729296000400},
+                {"id": "1a2b3c4d-5e6f-4a7b-8c9d-0e1f2a3b4c5d", "Domain": "example.edu", "password-rules": "minlength: 10;", "last_modified": 1729296000350},
+            ],
+        }
+        return Response(200, json.dumps(body).encode("utf-8"), {})
+
+    server.add_route(
+        "https://firefox.settings.services.mozilla.com/v1/buckets/monitor/collections/changes/changeset",
+        json.dumps({"changes": [{"bucket": "main", "collection": "password-rules", "last_modified": 1729296000400}]}),
+    )
+    server.add_route(COLLECTION_URL + "/changeset", changes)
+    remote_settings.main()
+
+    assert sorted(rule["Domain"] for rule in read_rules(tmp_path)) == ["example.com", "example.edu", "example.org"]
+
+
+def test_keeps_the_meta_when_changes_leave_the_snapshot_as_is(remote_settings, server, tmp_path):
+    remote_settings.main()
+    snapshot = (tmp_path / "RemotePasswordRules.json").read_text()
+    meta = (tmp_path / "RemotePasswordRules.meta.json").read_text()
+
+    # A record deleted upstream that the snapshot never had
+    server.add_route(
+        "https://firefox.settings.services.mozilla.com/v1/buckets/monitor/collections/changes/changeset",
+        json.dumps({"changes": [{"bucket": "main", "collection": "password-rules", "last_modified": 1729296000400}]}),
+    )
+    server.add_route(
+        COLLECTION_URL + "/changeset",
+        json.dumps({"timestamp": 1729296000400, "changes": [{"id": "unknown", "deleted": True, "last_modified": 1729296000400}]}),
+    )
+    remote_settings.main()
+    remote_settings.main()
+
+    assert (tmp_path / "RemotePasswordRules.json").read_text() == snapshot
+    assert (tmp_path / "RemotePasswordRules.meta.json").read_text() == meta
+    # Both runs fetched the changes since the recorded timestamp
+    assert [request.query["_since"] for request in server.requested(COLLECTION_URL + "/changeset")[1:]] == [['"1729296000200"']] * 2
+
+
+def test_refuses_collections_failing_validation(remote_settings, server, tmp_path):
+    server.add_route(COLLECTION_URL + "/changeset", json.dumps({"timestamp": 1, "changes": [{"id": "a", "Domain": "example.com"}]}))
+
+    with pytest.raises(SystemExit):
+        remote_settings.main()
+
+    assert not (tmp_path / "RemotePasswordRules.json").exists()
+
+
+def test_retries_server_errors(remote_settings, server, tmp_path):
+    server.fail(COLLECTION_URL + "/changeset", 502)
+
+    remote_settings.main()
+
+    assert len(server.requested(COLLECTION_URL + "/changeset")) == 2
+    assert len(read_rules(tmp_path)) == 3
+
+
+def test_refuses_collections_over_max_bytes(remote_settings, server, tmp_path):
+    config = json.loads((tmp_path / "config.json").read_text())
+    config["rules"][0]["max_bytes"] = 128
+    (tmp_path / "config.json").write_text(json.dumps(config))
+
+    with pytest.raises(SystemExit, match="128 allowed"):
+        remote_settings.main()
+
+    assert not (tmp_path / "RemotePasswordRules.json").exists()
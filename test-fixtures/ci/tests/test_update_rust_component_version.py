@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from conftest import load_script
+
+TAGS_URL = "https://api.github.com/repos/mozilla/rust-components-swift/tags"
+NEWEST_TAG = "133.0.20241018050242"
+NEWEST_COMMIT = "9d2c7b0e6f1a4b3c5d8e7f6a5b4c3d2e1f0a9b8c"
+CURRENT_TAG = "99.0.20240831050348"
+CURRENT_COMMIT = "003a732adbaeb9c009a7f0f2a91832a584a143a0"
+
+FIREFOX_RESOLVED = {
+    "pins": [
+        {
+            "identity": "rust-components-swift",
+            "kind": "remoteSourceControl",
+            "location": "https://github.com/mozilla/rust-components-swift.git",
+            "state": {"revision": CURRENT_COMMIT, "version": CURRENT_TAG},
+        },
+        {
+            "identity": "sentry-cocoa",
+            "kind": "remoteSourceControl",
+            "location": "https://github.com/getsentry/sentry-cocoa.git",
+            "state": {"revision": CURRENT_COMMIT, "version": CURRENT_TAG},
+        },
+    ],
+    "version": 2,
+}
+FOCUS_RESOLVED = {
+    "object": {
+        "pins": [
+            {
+                "package": "MozillaRustComponentsSwift",
+                "repositoryURL": "https://github.com/mozilla/rust-components-swift",
+                "state": {"branch": None, "revision": CURRENT_COMMIT, "version": CURRENT_TAG},
+            }
+        ]
+    },
+    "version": 1,
+}
+PROJECT = """\
+/* Begin XCRemoteSwiftPackageReference section */
+\t\t{id} /* XCRemoteSwiftPackageReference "rust-components-swift" */ = {{
+\t\t\tisa = XCRemoteSwiftPackageReference;
+\t\t\trepositoryURL = "https://github.com/mozilla/rust-components-swift.git";
+\t\t\trequirement = {{
+\t\t\t\tkind = exactVersion;
+\t\t\t\tversion = {version};
+\t\t\t}};
+\t\t}};
+\t\t0123456789ABCDEF01234567 /* XCRemoteSwiftPackageReference "sentry-cocoa" */ = {{
+\t\t\tisa = XCRemoteSwiftPackageReference;
+\t\t\trepositoryURL = "https://github.com/getsentry/sentry-cocoa.git";
+\t\t\trequirement = {{
+\t\t\t\tkind = exactVersion;
+\t\t\t\tversion = {version};
+\t\t\t}};
+\t\t}};
+/* End XCRemoteSwiftPackageReference section */
+"""
+
+
+@pytest.fixture
+def rust_update(server, tmp_path, monkeypatch):
+    module = load_script("test-fixtures/update-rust-component-version.py")
+    monkeypatch.setattr(module, "GITHUB_API_URL", server.url("https://api.github.com"))
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    module.get_newest_rust_components_version.cache_clear()
+
+    for name, product in module.PRODUCTS.items():
+        resolved = tmp_path / product["spm_package"]
+        resolved.parent.mkdir(parents=True)
+        resolved.write_text(json.dumps(FIREFOX_RESOLVED if name == "firefox" else FOCUS_RESOLVED, indent=2))
+        (tmp_path / product["project"]).write_text(PROJECT.format(id=product["package_reference_id"], version=CURRENT_TAG))
+    (tmp_path / "test-fixtures").mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("sys.argv", ["update-rust-component-version.py"])
+    return module
+
+
+def test_updates_every_product_with_a_single_api_call(rust_update, server, tmp_path):
+    rust_update.main()
+
+    assert len(server.requested(TAGS_URL)) == 1
+    assert (tmp_path / "test-fixtures/newest_tag.txt").read_text() == NEWEST_TAG + "\n"
+    for product in rust_update.PRODUCTS.values():
+        resolved = json.loads((tmp_path / product["spm_package"]).read_text())
+        pin = rust_update.find_rust_components_pin(resolved)
+        assert pin["state"]["version"] == NEWEST_TAG
+        assert pin["state"]["revision"] == NEWEST_COMMIT
+
+
+def test_only_patches_the_rust_components(rust_update, tmp_path):
+    rust_update.main()
+
+    firefox = rust_update.PRODUCTS["firefox"]
+    resolved = json.loads((tmp_path / firefox["spm_package"]).read_text())
+    assert resolved["pins"][1]["state"] == {"revision": CURRENT_COMMIT, "version": CURRENT_TAG}
+    project = (tmp_path / firefox["project"]).read_text()
+    assert project == PROJECT.format(id=firefox["package_reference_id"], version=CURRENT_TAG).replace(
+        "version = {};".format(CURRENT_TAG), "version = {};".format(NEWEST_TAG), 1
+    )
+
+
+def test_compares_versions_as_semver(rust_update):
+    # 99.0 sorts after 133.0 as a string
+    assert rust_update.compare_versions(CURRENT_TAG, NEWEST_TAG)
+    assert not rust_update.compare_versions(NEWEST_TAG, CURRENT_TAG)
+
+
+def test_does_nothing_when_up_to_date(rust_update, server, tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["update-rust-component-version.py", "--product", "focus"])
+    rust_update.main()
+    focus = (tmp_path / rust_update.PRODUCTS["focus"]["spm_package"]).read_text()
+
+    rust_update.get_newest_rust_components_version.cache_clear()
+    (tmp_path / "test-fixtures/newest_tag.txt").unlink()
+    rust_update.main()
+
+    assert (tmp_path / rust_update.PRODUCTS["focus"]["spm_package"]).read_text() == focus
+    assert not (tmp_path / "test-fixtures/newest_tag.txt").exists()
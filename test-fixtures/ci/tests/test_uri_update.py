@@ -0,0 +1,76 @@
+import pytest
+
+from conftest import load_script
+
+CSV_URL = "https://www.iana.org/assignments/uri-schemes/uri-schemes-1.csv"
+SWIFT_FILE = """\
+import Foundation
+
+extension URL {
+    private let permanentURISchemes = [
+        "about",
+        "data",
+        "gopher",
+        "http",
+        "https",
+    ]
+}
+"""
+
+
+@pytest.fixture
+def uri_update(server, tmp_path, monkeypatch):
+    module = load_script("test-fixtures/ci/uri_update.py")
+    (tmp_path / "URLExtensions.swift").write_text(SWIFT_FILE)
+    monkeypatch.setitem(module.CONFIG, "URI_WEBSITE", server.url(CSV_URL))
+    monkeypatch.setitem(module.CONFIG, "IOS_URI_PATH", str(tmp_path))
+    monkeypatch.delenv("VENDORED_SYNC_CACHE", raising=False)
+    return module
+
+
+def read_uris(tmp_path, module):
+    lines = (tmp_path / "URLExtensions.swift").read_text().splitlines(keepends=True)
+    return module.parse_swift_lines(lines)[3]
+
+
+def test_updates_the_permanent_uri_schemes(uri_update, tmp_path):
+    uri_update.main([])
+
+    assert read_uris(tmp_path, uri_update) == ["aaa", "about", "acap", "data", "ftp", "http", "https", "mailto", "tel"]
+
+
+def test_dry_run_leaves_the_swift_file_alone(uri_update, tmp_path):
+    uri_update.main(["--dry-run"])
+
+    assert (tmp_path / "URLExtensions.swift").read_text() == SWIFT_FILE
+
+
+def test_conditional_requests_skip_unchanged_csv(uri_update, server, tmp_path, monkeypatch):
+    monkeypatch.setenv("VENDORED_SYNC_CACHE", str(tmp_path / "cache.json"))
+    uri_update.main([])
+    updated = (tmp_path / "URLExtensions.swift").read_text()
+
+    uri_update.main([])
+
+    requests = server.requested(CSV_URL)
+    assert "If-None-Match" not in requests[0].headers
+    assert "If-None-Match" in requests[1].headers
+    assert (tmp_path / "URLExtensions.swift").read_text() == updated
+
+
+def test_retries_server_errors(uri_update, server, tmp_path):
+    server.fail(CSV_URL, 503, 504)
+
+    uri_update.main([])
+
+    assert len(server.requested(CSV_URL)) == 3
+    assert "gopher" not in read_uris(tmp_path, uri_update)
+
+
+def test_fails_after_exhausting_retries(uri_update, server, tmp_path):
+    server.fail(CSV_URL, 503, 503, 503)
+
+    with pytest.raises(SystemExit):
+        uri_update.main([])
+
+    assert (tmp_path / "URLExtensions.swift").read_text() == SWIFT_FILE
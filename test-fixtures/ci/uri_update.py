@@ -7,19 +7,18 @@ It fetches the CSV, parses it for permanent URI schemes, compares them with the
 and updates the Swift file if there are new or removed URIs.
 
 Usage:
-    python uri_update.py
+    python uri_update.py [--dry-run]
 """
 
 
+import argparse
+import csv
 import io
 import logging
 import re
 import sys
 
-import pandas as pd  # pandas 3.0 will require pyarrow as a dependency
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from vendored_sync import ConditionalCache, Source, SyncError, create_session, sync
 
 
 CONFIG = {
@@ -31,34 +30,33 @@ CONFIG = {
     "STATUS_FORCELIST": [500, 502, 503, 504],
 }
 
+URI_PATTERN = re.compile(r'"([^"]+)"')
+
 
 # use exponential backoff because why not
-def get_uri_csv(url):
+def create_uri_session():
+    return create_session(
+        pool_size=1,
+        retries=CONFIG["RETRIES"],
+        backoff_factor=CONFIG["BACKOFF_FACTOR"],
+        status_forcelist=CONFIG["STATUS_FORCELIST"],
+    )
+
+
+def iter_permanent_uri_schemes(csv_lines):
     """
-    Fetches the URI CSV from the specified URL with retry logic.
+    Yields the permanent, non-obsolete URI schemes of the CSV, one row at a time.
 
     Parameters:
-    - url (str): The URL to fetch the CSV from.
+    - csv_lines (iterable): The lines of the CSV file.
 
     Returns:
-    - str: The content of the CSV file.
+    - generator: The permanent URI schemes, in CSV order.
     """
-    session = requests.Session()
-    retries = Retry(
-        total=CONFIG["RETRIES"],
-        backoff_factor=CONFIG["BACKOFF_FACTOR"],
-        status_forcelist=CONFIG["STATUS_FORCELIST"],
-    )
-    session.mount("http://", HTTPAdapter(max_retries=retries))
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-
-    try:
-        response = session.get(url)
-        response.raise_for_status()
-        return response.content.decode("utf-8")
-    except Exception as e:
-        logging.error("Failed to get CSV: %r", e)
-        sys.exit(1)
+    for row in csv.DictReader(csv_lines):
+        scheme = row.get("URI Scheme")
+        if scheme and row.get("Status") == "Permanent" and "OBSOLETE" not in scheme:
+            yield scheme
 
 
 def parse_uri_csv(api_response_csv):
@@ -66,126 +64,137 @@ def parse_uri_csv(api_response_csv):
     Parses the given CSV content for permanent URI schemes.
 
     Parameters:
-    - api_response_csv (str): The CSV content returned from the api as a string.
+    - api_response_csv (str or iterable): The CSV content returned from the api, as a
+      string or as an iterable of lines.
 
     Returns:
-    - list: A list of permanent URI schemes.
+    - list: A sorted list of permanent URI schemes.
     """
-    df = pd.read_csv(io.StringIO(api_response_csv))
-    filtered_df = df[
-        (df["Status"] == "Permanent")
-        & (~df["URI Scheme"].str.contains("OBSOLETE", na=False))
-    ]
-    return filtered_df["URI Scheme"].dropna().sort_values().tolist()
+    if isinstance(api_response_csv, str):
+        api_response_csv = io.StringIO(api_response_csv)
+    return sorted(iter_permanent_uri_schemes(api_response_csv))
 
 
-def update_swift_file(new_urischemes, swift_file_path):
+def parse_swift_lines(lines):
     """
-    Updates the Swift file with new URI schemes.
+    Locates the URI schemes section in the lines of the Swift file.
 
     Parameters:
-    - new_urischemes (list): A list of new URI schemes to update in the Swift file.
-    - swift_file_path (str): The file path of the Swift file to update.
+    - lines (list): The lines of the Swift file.
 
+    Returns:
+    - tuple: The lines, the 0-based indices of the first scheme line and of the closing
+      bracket line, and the list of URIs found in between.
     """
-    try:
-        start_index, end_index = find_uris_section_indices(swift_file_path)
-
-        with open(swift_file_path, "r") as file:
-            lines = file.readlines()
-
-        new_lines = [f'    "{scheme}",\n' for scheme in new_urischemes]
-        # end_index must be non-inclusive to avoid removing ']' when there are fewer URIs in the new list
-        updated_lines = lines[:start_index] + new_lines + lines[end_index - 1 :]
+    start_index = -1
+    end_index = -1
+    uris = []
+    for i, line in enumerate(lines):
+        if start_index == -1:
+            if "private let permanentURISchemes" in line:
+                start_index = i + 1
+            continue
+        if "]" in line:
+            end_index = i
+            break
+        # Extract URI between the first pair of double quotes
+        match = URI_PATTERN.search(line)
+        if match:
+            uris.append(match.group(1))
 
-        with open(swift_file_path, "w") as file:
-            file.writelines(updated_lines)
-    except Exception as e:
-        logging.error("Failed to update the Swift file: %r", e)
-        sys.exit(1)
+    if start_index == -1 or end_index == -1:
+        raise ValueError("Could not find 'permanentURISchemes' array in the Swift file.")
+    return lines, start_index, end_index, uris
 
 
-def find_uris_section_indices(swift_file_path):
+def diff_uris(current_uris, new_uris):
     """
-    Finds the start and end indices of the URI schemes section in the Swift file.
+    Computes the symmetric difference between the URIs in the Swift file and the IANA ones.
 
     Parameters:
-    - swift_file_path (str): The file path of the Swift file.
+    - current_uris (list): The URIs currently in the Swift file.
+    - new_uris (list): The permanent URIs from IANA.
 
     Returns:
-    - tuple: A tuple containing the start and end line numbers of the URI schemes section.
+    - tuple: The sorted lists of added and removed URIs.
     """
-    start_index = -1
-    end_index = -1
+    current, new = set(current_uris), set(new_uris)
+    return sorted(new - current), sorted(current - new)
 
-    try:
-        with open(swift_file_path, "r") as file:
-            # Use enumerate to iterate with 1-based index
-            for i, line in enumerate(file, start=1):
-                if "private let permanentURISchemes" in line and start_index == -1:
-                    start_index = i
-                    continue
-                if start_index != -1 and "]" in line:
-                    end_index = i
-                    break
-    except Exception as e:
-        logging.error("An error occurred while reading %r: %r", swift_file_path, e)
-        sys.exit(1)
 
-    if start_index == -1 or end_index == -1:
-        logging.error("Could not find 'permanentURISchemes' array in the Swift file.")
-        sys.exit(1)
-    return start_index, end_index
+def render_swift_lines(new_urischemes, lines, start_index, end_index):
+    """
+    Replaces the URI schemes section of the Swift file.
+
+    Parameters:
+    - new_urischemes (list): A list of new URI schemes to put in the Swift file.
+    - lines (list): The current lines of the Swift file.
+    - start_index (int): The 0-based index of the first URI scheme line.
+    - end_index (int): The 0-based index of the line closing the URI schemes array.
+
+    Returns:
+    - list: The updated lines of the Swift file.
+    """
+    new_lines = [f'    "{scheme}",\n' for scheme in new_urischemes]
+    return lines[:start_index] + new_lines + lines[end_index:]
 
 
-def extract_current_uris(swift_file_path):
+def build_swift_file(csv_lines, current_swift):
     """
-    Extracts the current URIs from the Swift file.
+    Computes the new Swift file from the IANA CSV, as a vendored_sync transform.
 
     Parameters:
-    - swift_file_path (str): The file path of the Swift file.
+    - csv_lines (iterator): The lines of the CSV, streamed from the response.
+    - current_swift (bytes): The current content of the Swift file.
 
     Returns:
-    - list: A list of URIs extracted from the Swift file.
+    - str: The updated Swift file, or None if no URI was added or removed.
     """
-    # start/end use 1-based index for true line number
-    start_line, end_line = find_uris_section_indices(swift_file_path)
-    uris = []
-    try:
-        with open(swift_file_path, "r") as file:
-            # use enumerate and start i at 1 for 1-based index
-            for i, line in enumerate(file, start=1):
-                if start_line <= i <= end_line:
-                    # Extract URI between the first pair of double quotes
-                    match = re.search(r'"([^"]+)"', line)
-                    if match:
-                        uris.append(match.group(1))
-                elif i == end_line:
-                    break
-    except Exception as e:
-        logging.error("An error occurred while reading %r: %r", swift_file_path, e)
-        sys.exit(1)
-    return uris
+    permanent_urischemes = parse_uri_csv(csv_lines)
+    lines, start_index, end_index, current_uris = parse_swift_lines(
+        current_swift.decode("utf-8").splitlines(keepends=True)
+    )
+    added, removed = diff_uris(current_uris, permanent_urischemes)
+    logging.info(
+        "%d URIs in the Swift file, %d permanent URIs from IANA",
+        len(current_uris),
+        len(permanent_urischemes),
+    )
+    logging.info("Added (%d): %s", len(added), added)
+    logging.info("Removed (%d): %s", len(removed), removed)
 
+    if not added and not removed:
+        logging.info("No update needed. File contains latest permanent URISchemes.")
+        return None
+    return "".join(render_swift_lines(permanent_urischemes, lines, start_index, end_index))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report the added and removed URI schemes without modifying the Swift file",
+    )
+    args = parser.parse_args(argv)
 
-def main():
     logging.info("Current CONFIG for task:\n%r", CONFIG)
     csv_url = CONFIG["URI_WEBSITE"]
     swift_file_path = "%s/%s" % (CONFIG["IOS_URI_PATH"], CONFIG["IOS_URIS_FILE"])
 
+    source = Source(
+        "IANA URI schemes",
+        csv_url,
+        swift_file_path,
+        transform=build_swift_file,
+        stream=True,
+    )
+
     try:
-        uri_response_csv = get_uri_csv(csv_url)
-        permanent_urischemes = parse_uri_csv(uri_response_csv)
-        current_uris = extract_current_uris(swift_file_path)
-        uri_diff = [uri for uri in permanent_urischemes if uri not in set(current_uris)]
-
-        if uri_diff:
-            logging.info(f"Updating URIs with diff: {uri_diff}")
-            update_swift_file(permanent_urischemes, swift_file_path)
-        else:
-            logging.info("No update needed. File contains latest permanent URISchemes.")
-    except Exception as e:
-        logging.error("Error occurred: %r", e)
+        with create_uri_session() as session:
+            sync([source], session=session, cache=ConditionalCache.from_env(), dry_run=args.dry_run)
+    except SyncError as e:
+        logging.error("Error occurred: %s", e)
         sys.exit(1)
 
 
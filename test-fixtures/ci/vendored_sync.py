@@ -0,0 +1,278 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Shared engine for the scheduled jobs that vendor upstream data into the tree
+(uri_update.py, Update_Remote_Settings.py, CC_Python_Update.py, update.py).
+
+A job declares its sources: the URL to fetch, the file of the tree it maintains
+and how to turn the response into the content of that file. `sync()` then:
+
+- fetches every source concurrently, over one pooled session that retries
+  server errors with exponential backoff,
+- sends conditional requests (If-None-Match/If-Modified-Since) when a cache is
+  given and the target still matches what the last run wrote,
+- compares the new content with the target by hash, in memory,
+- and only once every source was fetched successfully, writes the changed
+  targets atomically.
+
+Setting the VENDORED_SYNC_CACHE environment variable to a JSON file path enables
+the conditional request cache for the jobs using `ConditionalCache.from_env()`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRIES = 2
+BACKOFF_FACTOR = 0.3
+STATUS_FORCELIST = [500, 502, 503, 504]
+MAX_WORKERS = 8
+TIMEOUT = 60
+
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+NOT_MODIFIED = "not-modified"
+MISSING = "missing"
+
+SyncResult = namedtuple("SyncResult", ["name", "target", "status", "sha256"])
+
+
+class SyncError(Exception):
+    pass
+
+
+class Source:
+    """
+    An upstream file and the file of the tree it is vendored into.
+
+    Parameters:
+    - name (str): Name used in logs.
+    - url (str): URL to fetch.
+    - target (str): Path of the vendored file, or None if the response isn't written anywhere.
+    - transform (callable): Called with the response payload and the current content of the
+      target (bytes, or None if it doesn't exist). Returns the new content of the target as
+      str or bytes, or None to leave it alone. Defaults to vendoring the response as is.
+    - params (dict): Query parameters of the request.
+    - headers (dict): Extra headers of the request.
+    - stream (bool): Pass the transform an iterator over the decoded lines of the response
+      instead of its content, so that large responses are never held in memory.
+    - missing_ok (bool): Report a 404 as MISSING instead of failing the whole sync.
+    """
+
+    def __init__(
+        self,
+        name,
+        url,
+        target,
+        transform=None,
+        params=None,
+        headers=None,
+        stream=False,
+        encoding="utf-8",
+        missing_ok=False,
+    ):
+        self.name = name
+        self.url = url
+        self.target = target
+        self.transform = transform
+        self.params = params
+        self.headers = headers or {}
+        self.stream = stream
+        self.encoding = encoding
+        self.missing_ok = missing_ok
+
+
+class ConditionalCache:
+    """
+    Remembers the validators (ETag, Last-Modified) of the last response of each source,
+    with the hash of the target they produced.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                self.entries = json.load(f)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("VENDORED_SYNC_CACHE"))
+
+    def headers(self, source, target_hash):
+        entry = self.entries.get(self._key(source))
+        # Only trust the validators if nothing touched the target since they were stored
+        if not entry or entry.get("target_sha256") != target_hash:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, source, validators, target_hash):
+        if not any(validators.values()):
+            self.entries.pop(self._key(source), None)
+            return
+        self.entries[self._key(source)] = dict(validators, target_sha256=target_hash)
+
+    def get(self, name, default=None):
+        """Returns a value a job stored with `set()`, e.g. the last upstream revision it checked."""
+        return self.entries.get(name, default)
+
+    def set(self, name, value):
+        self.entries[name] = value
+
+    def save(self):
+        if self.path:
+            atomic_write(self.path, (json.dumps(self.entries, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+
+    @staticmethod
+    def _key(source):
+        return "{} -> {}".format(source.url, source.target)
+
+
+def create_session(
+    pool_size=MAX_WORKERS,
+    retries=RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=STATUS_FORCELIST,
+):
+    """
+    Creates a session sharing a pool of `pool_size` connections per host, retrying
+    server errors with exponential backoff.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=status_forcelist,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def read_file(path):
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def atomic_write(path, content):
+    """Writes `content` to a temporary file next to `path`, then moves it in place."""
+    tmp_path = "{}.tmp".format(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def sync(sources, session=None, cache=None, dry_run=False, max_workers=MAX_WORKERS):
+    """
+    Fetches every source and writes the targets whose content changed.
+
+    Nothing is written unless every source was fetched and transformed successfully.
+
+    Returns:
+    - list: A SyncResult per source, in order.
+
+    Raises:
+    - SyncError: If any source failed.
+    """
+    own_session = session is None
+    if own_session:
+        session = create_session(pool_size=max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_fetch, session, cache, source) for source in sources]
+
+        fetched, errors = [], []
+        for source, future in zip(sources, futures):
+            try:
+                fetched.append(future.result())
+            except Exception as e:
+                errors.append("{}: {!r}".format(source.name, e))
+        if errors:
+            raise SyncError("Failed to sync:\n * " + "\n * ".join(errors))
+    finally:
+        if own_session:
+            session.close()
+
+    results = []
+    for source, (status, content, sha256, validators) in zip(sources, fetched):
+        if status in (CREATED, UPDATED) and source.target is not None and not dry_run:
+            atomic_write(source.target, content)
+        logging.info("%s: %s%s", source.name, status, " (dry run)" if dry_run else "")
+
+        if cache is not None and validators is not None and not dry_run:
+            cache.update(source, validators, sha256)
+        results.append(SyncResult(source.name, source.target, status, sha256))
+
+    if cache is not None and not dry_run:
+        cache.save()
+    return results
+
+
+def _fetch(session, cache, source):
+    current = read_file(source.target)
+    current_hash = content_hash(current) if current is not None else None
+
+    headers = dict(source.headers)
+    if cache is not None:
+        headers.update(cache.headers(source, current_hash))
+
+    with session.get(
+        source.url,
+        params=source.params,
+        headers=headers,
+        stream=source.stream,
+        timeout=TIMEOUT,
+    ) as response:
+        if response.status_code == 304:
+            return NOT_MODIFIED, None, current_hash, None
+        if response.status_code == 404 and source.missing_ok:
+            return MISSING, None, None, None
+        response.raise_for_status()
+
+        if source.stream:
+            response.encoding = source.encoding
+            payload = response.iter_lines(decode_unicode=True)
+        else:
+            payload = response.content
+        content = source.transform(payload, current) if source.transform else payload
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    if content is None:
+        return UNCHANGED, None, current_hash, validators
+    if isinstance(content, str):
+        content = content.encode(source.encoding)
+
+    sha256 = content_hash(content)
+    if sha256 == current_hash:
+        return UNCHANGED, None, sha256, validators
+    return (CREATED if current is None else UPDATED), content, sha256, validators
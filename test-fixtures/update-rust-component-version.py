@@ -1,18 +1,36 @@
+import argparse
+import functools
 import json
 import logging
-import requests
+import os
 import re
+import requests
 from github import Github
-from pbxproj import XcodeProject
+
+# From test-fixtures/ci, which the workflow puts on PYTHONPATH
+from spm_dependency_bumps import is_newer
 
 # Constants
+GITHUB_API_URL = "https://api.github.com"
 GITHUB_REPO = "mozilla/rust-components-swift"
-FIREFOX_SPM_PACKAGE = "firefox-ios/Client.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved"
-FIREFOX_PROJECT = "firefox-ios/Client.xcodeproj/project.pbxproj"
-FOCUS_SPM_PACKAGE = "focus-ios/Blockzilla.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved"
-FOCUS_PROJECT = "focus-ios/Blockzilla.xcodeproj/project.pbxproj"
-FIREFOX_RUST_COMPONENTS_ID = "433F87D62788F34500693368"
-FOCUS_RUST_COMPONENTS_ID = "45E8FFE52828DE4A0027A8F5"
+RUST_COMPONENTS_URL = "github.com/mozilla/rust-components-swift"
+NEWEST_TAG_FILE = "test-fixtures/newest_tag.txt"
+
+# Every project pinning the Rust components, with the id of its XCRemoteSwiftPackageReference
+PRODUCTS = {
+    "firefox": {
+        "spm_package": "firefox-ios/Client.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+        "project": "firefox-ios/Client.xcodeproj/project.pbxproj",
+        "package_reference_id": "433F87D62788F34500693368",
+    },
+    "focus": {
+        "spm_package": "focus-ios/Blockzilla.xcodeproj/project.xcworkspace/xcshareddata/swiftpm/Package.resolved",
+        "project": "focus-ios/Blockzilla.xcodeproj/project.pbxproj",
+        "package_reference_id": "45E8FFE52828DE4A0027A8F5",
+    },
+}
+
+PROJECT_VERSION = re.compile(r'(\b(?:minimumVersion|version) = )("?)([^;"]+)\2;')
 
 
 def _init_logging():
@@ -21,63 +39,95 @@ def _init_logging():
         level=logging.INFO,
     )
 
-# Get the newest version and commit of the Rust components from the GitHub repository
-def get_newest_rust_components_version(GITHUB_REPO):
+# Get the newest version and commit of the Rust components from the GitHub repository.
+# Cached, so that every product is compared against a single API call: the repository
+# is fetched lazily and the tags are listed one per page.
+@functools.lru_cache(maxsize=None)
+def get_newest_rust_components_version(github_repo=GITHUB_REPO):
     try:
-        repo = Github().get_repo(GITHUB_REPO)
+        repo = Github(os.getenv("GITHUB_TOKEN"), base_url=GITHUB_API_URL, per_page=1, lazy=True).get_repo(github_repo)
         nightly_tag = repo.get_tags()[0]
-        return str(nightly_tag.name), re.findall(r'"([^"]*)"', str(nightly_tag.commit))[0]
+        return str(nightly_tag.name), str(nightly_tag.commit.sha)
     except requests.exceptions.HTTPError as err:
         raise SystemExit(err)
 
 
-# Read the current version and commit of the Rust components from the SPM package file
-def read_rust_components_tag_version(SPM_PACKAGE):
-    try:
-        with open(SPM_PACKAGE) as f:
-            data = json.load(f)
-            if SPM_PACKAGE == FOCUS_SPM_PACKAGE:
-                data = data["object"]
-            for i in data["pins"]:
-                if SPM_PACKAGE == FOCUS_SPM_PACKAGE:
-                    if i["package"] == "MozillaRustComponentsSwift":
-                        state_values = i["state"]["version"], i["state"]["revision"]
-                else:
-                    if i["identity"] == "rust-components-swift":
-                        state_values = i["state"]["version"], i["state"]["revision"]
-            return state_values
+def read_text(file_name):
+    with open(file_name, encoding="utf-8") as f:
+        return f.read()
 
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logging.info(f"Error reading rust component tag: {e}")
-    except Exception as e:
-        logging.info(f"Unexpected error: {e}")
-    return None, None
 
-# Read the minimum required version of the Rust components from the Firefox project file
-def read_project_min_version(PROJECT, RUST_COMPONENTS_ID):
-    try:
-        project = XcodeProject.load(PROJECT)
-        return project.get_object(RUST_COMPONENTS_ID).requirement.version
-    except Exception as e:
-        logging.info(f"Error reading project minimum version: {e}")
+def write_text(file_name, data):
+    tmp_file_name = file_name + ".tmp"
+    with open(tmp_file_name, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_file_name, file_name)
+
+
+# Find the Rust components pin of a Package.resolved, in both the v1 and v2 formats
+def find_rust_components_pin(package):
+    pins = package["object"]["pins"] if "object" in package else package["pins"]
+    for pin in pins:
+        if RUST_COMPONENTS_URL in pin.get("location", pin.get("repositoryURL", "")):
+            return pin
+    return None
+
+
+# Find the text span of an object of the project file from its id
+def find_project_object(data, object_id):
+    match = re.search(r"^\t\t{} /\* .* \*/ = {{$".format(re.escape(object_id)), data, re.MULTILINE)
+    if not match:
         return None
+    return match.start(), data.index("\n\t\t};", match.end())
 
-# Compare version strings to determine if we need to update current version
-def compare_versions(current_tag_version, repo_tag_version):
-    return current_tag_version < repo_tag_version
 
-# Update the specified file with the new Rust components version and commit
-def update_file(current_tag, current_commit, rust_component_repo_tag, rust_component_repo_commit, file_name):
+def read_product(name, product):
+    '''
+    Reads the current Rust components version of a product: the state of its
+    Package.resolved pin and the version required by its project file.
+    '''
+    state = {"name": name, "product": product, "tag": None, "commit": None, "min_version": None}
     try:
-        with open(file_name, "r+") as file:
-            data = file.read()
-            for old, new in [(current_tag, rust_component_repo_tag), (current_commit, rust_component_repo_commit)]:
-                if old is not None and new is not None:
-                    data = data.replace(old, new)
-            file.seek(0)
-            file.write(data)
-    except (FileNotFoundError, IOError) as e:
-        logging.info(f"Error updating file: {e}")
+        state["spm_data"] = read_text(product["spm_package"])
+        pin = find_rust_components_pin(json.loads(state["spm_data"]))
+        if pin:
+            state["pin"] = pin
+            state["tag"], state["commit"] = pin["state"]["version"], pin["state"]["revision"]
+
+        state["project_data"] = read_text(product["project"])
+        span = find_project_object(state["project_data"], product["package_reference_id"])
+        match = PROJECT_VERSION.search(state["project_data"], *span) if span else None
+        if match:
+            state["min_version"] = match.group(3)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.info(f"Error reading {name} rust component version: {e}")
+    return state
+
+# Compare versions as semver to determine if we need to update current version
+def compare_versions(current_tag_version, repo_tag_version):
+    return is_newer(current_tag_version, repo_tag_version)
+
+# Replace the version and revision of the Rust components pin only
+def update_spm_package(state, rust_component_repo_tag, rust_component_repo_commit):
+    data = state["spm_data"]
+    url = state["pin"].get("location", state["pin"].get("repositoryURL"))
+    start = data.index(json.dumps(url))
+    end = data.index("}", data.index('"state"', start))
+    pin_data = data[start:end]
+    for old, new in [(state["tag"], rust_component_repo_tag), (state["commit"], rust_component_repo_commit)]:
+        pin_data = pin_data.replace(json.dumps(old), json.dumps(new), 1)
+    write_text(state["product"]["spm_package"], data[:start] + pin_data + data[end:])
+
+# Replace the required version of the Rust components package reference only
+def update_project(state, rust_component_repo_tag):
+    data = state["project_data"]
+    start, end = find_project_object(data, state["product"]["package_reference_id"])
+    object_data = PROJECT_VERSION.sub(
+        lambda match: f"{match.group(1)}{match.group(2)}{rust_component_repo_tag}{match.group(2)};",
+        data[start:end],
+        count=1,
+    )
+    write_text(state["product"]["project"], data[:start] + object_data + data[end:])
 
 
 def main():
@@ -85,29 +135,37 @@ def main():
     STEPS
     1. check Rust Components repo for newest tagged version
     2. compare newest with current SPM and project versions in repo
-    3. if same version exit, if not, continue 
+    3. if same version exit, if not, continue
     4. update both SMP and project files
-    
-    '''
-    _init_logging()
-
-    rust_component_repo_tag, rust_component_repo_commit = get_newest_rust_components_version(GITHUB_REPO)
-    firefox_current_tag, firefox_current_commit = read_rust_components_tag_version(FIREFOX_SPM_PACKAGE)
-    firefox_current_min_version = read_project_min_version(FIREFOX_PROJECT, FIREFOX_RUST_COMPONENTS_ID)
 
-    focus_current_tag, focus_current_commit = read_rust_components_tag_version(FOCUS_SPM_PACKAGE)
-    focus_current_min_version = read_project_min_version(FOCUS_PROJECT, FOCUS_RUST_COMPONENTS_ID)
+    '''
+    parser = argparse.ArgumentParser(description="Updates the Rust components to their newest tag.")
+    parser.add_argument("--product", action="append", choices=sorted(PRODUCTS), help="product to update, all of them by default")
+    parser.add_argument("--newest-tag-file", default=NEWEST_TAG_FILE, help="where to save the new tag, for the PR info")
+    args = parser.parse_args()
 
-    if firefox_current_min_version and compare_versions(firefox_current_tag, rust_component_repo_tag):
-        update_file(firefox_current_tag, firefox_current_commit, rust_component_repo_tag, rust_component_repo_commit, FIREFOX_SPM_PACKAGE)
-        update_file(firefox_current_min_version, None, rust_component_repo_tag, None, FIREFOX_PROJECT)
+    _init_logging()
 
-        with open("test-fixtures/newest_tag.txt", "w+") as f:
+    states = [read_product(name, PRODUCTS[name]) for name in (args.product or sorted(PRODUCTS))]
+    rust_component_repo_tag, rust_component_repo_commit = get_newest_rust_components_version()
+
+    updated = False
+    for state in states:
+        if not state["min_version"] or not state["tag"]:
+            logging.info(f"No rust components version found for {state['name']}, skip")
+            continue
+        if not compare_versions(state["tag"], rust_component_repo_tag):
+            logging.info(f"{state['name']} already uses {state['tag']}, skip")
+            continue
+
+        logging.info(f"Updating {state['name']} from {state['tag']} to {rust_component_repo_tag}")
+        update_spm_package(state, rust_component_repo_tag, rust_component_repo_commit)
+        update_project(state, rust_component_repo_tag)
+        updated = True
+
+    if updated:
+        with open(args.newest_tag_file, "w+") as f:
             f.write(rust_component_repo_tag + "\n")
 
-    if compare_versions(focus_current_tag, rust_component_repo_tag) and compare_versions(focus_current_tag, rust_component_repo_tag):
-        update_file(focus_current_tag, focus_current_commit, rust_component_repo_tag, rust_component_repo_commit, FOCUS_SPM_PACKAGE)
-        update_file(focus_current_min_version, None, rust_component_repo_tag, None, FOCUS_PROJECT)
-
 if __name__ == '__main__':
     main()
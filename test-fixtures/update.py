@@ -1,14 +1,10 @@
-import os
+import argparse
+import json
 import re
 import sys
-import pathlib
-from shutil import copyfile
-from ruamel.yaml import YAML
 
-
-import requests
-import semver
-from requests.exceptions import HTTPError
+# Lives in ./ci, run with PYTHONPATH=test-fixtures/ci
+from vendored_sync import ConditionalCache, Source, SyncError, atomic_write, read_file, sync
 
 
 BITRISE_STACK_INFO = 'https://app.bitrise.io/app/6c06d3a40422d10f/all_stack_info'
@@ -24,10 +20,12 @@ pattern = 'osx-xcode-'
 patterns = [pattern]
 BITRISE_YML = 'bitrise.yml'
 WORKFLOW = 'NewXcodeVersions'
+STACK_PATH = ('workflows', WORKFLOW, 'meta', 'bitrise.io', 'stack')
 
-resp = requests.get(BITRISE_STACK_INFO)
-resp.raise_for_status()
-resp_json = resp.json()
+KEY_LINE = re.compile(r'''^(?P<indent> *)(?P<quote>['"]?)(?P<key>[^'"\s#:-][^'"#:]*)(?P=quote):(?:\s+(?P<value>.*))?$''')
+STACK_LINE = re.compile(r'''^(?P<prefix> *stack:\s*)(?P<quote>['"]?)(?P<value>[^'"\s#]+)(?P=quote)(?P<suffix>.*)$''')
+BLOCK_SCALAR = re.compile(r'^[|>][-+0-9]*(\s+#.*)?$')
+SEQUENCE_ITEM = re.compile(r'^(?: *- +)+')
 
 
 def parse_semver(raw_str):
@@ -39,15 +37,89 @@ def parse_semver(raw_str):
         return False
 
 
-def default_stack():
-    try:
-        resp = requests.get(BITRISE_STACK_INFO)
-        resp_json = resp.json()
-        return resp_json['project_types_with_default_stacks']['ios']['default_stack']
-    except HTTPError as http_error:
-        print('An HTTP error has occurred: {http_error}')
-    except Exception as err:
-        print('An exception has occurred: {err}')
+def default_stack(stack_info):
+    return stack_info['project_types_with_default_stacks']['ios']['default_stack']
+
+
+def find_key_line(lines, path):
+    '''
+    Returns the index of the line holding the last key of `path` in a block
+    style YAML document, or None if it isn't there. Only the indentation of
+    the mapping keys is tracked, which is all bitrise.yml needs.
+    '''
+    keys = []
+    block_indent = None
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+
+        # skip the content of multiline strings, e.g. `content: |` scripts
+        if block_indent is not None:
+            if indent > block_indent:
+                continue
+            block_indent = None
+
+        while keys and keys[-1][0] >= indent:
+            keys.pop()
+
+        item = SEQUENCE_ITEM.match(line)
+        if item:
+            # not part of any path, but `- content: |` scripts hold lines looking like keys
+            column = len(item.group(0))
+            match = KEY_LINE.match(' ' * column + line[column:].rstrip('\r\n'))
+            if match and match.group('value') and BLOCK_SCALAR.match(match.group('value')):
+                block_indent = column
+            continue
+
+        match = KEY_LINE.match(line.rstrip('\r\n'))
+        if not match:
+            continue
+        keys.append((indent, match.group('key')))
+        if tuple(key for _, key in keys) == path:
+            return index
+        if match.group('value') and BLOCK_SCALAR.match(match.group('value')):
+            block_indent = indent
+    return None
+
+
+def update_stack(payload, current_yml):
+    '''
+    Transform of the Bitrise stack info source: returns bitrise.yml with the
+    stack of WORKFLOW set to the default one, or None if it's already used.
+
+    Only the stack line is rewritten, the rest of the file is kept byte for byte.
+    '''
+    largest_semver = default_stack(json.loads(payload)).split(pattern)[1]
+
+    lines = current_yml.decode('utf-8').splitlines(True)
+    index = find_key_line(lines, STACK_PATH)
+    line = lines[index] if index is not None else ''
+    match = STACK_LINE.match(line.rstrip('\r\n'))
+    if not match:
+        raise ValueError('No {0} stack in {1}'.format(WORKFLOW, BITRISE_YML))
+
+    # remove pattern prefix from current_semver to compare with largest
+    current_semver = match.group('value').split(pattern)[1]
+
+    if current_semver == largest_semver:
+        print('Xcode version unchanged! aborting.')
+        return None
+
+    print('New Xcode version available: {0} ... updating bitrise.yml!'.format(largest_semver))
+    # add prefix pattern back to be recognizable by bitrise
+    # as a valid stack value
+    lines[index] = '{0}{1}{2}{3}{1}{4}{5}'.format(
+        match.group('prefix'),
+        match.group('quote'),
+        pattern,
+        largest_semver,
+        match.group('suffix'),
+        line[len(line.rstrip('\r\n')):],
+    )
+    return ''.join(lines)
+
 
 if __name__ == '__main__':
     '''
@@ -57,33 +129,22 @@ if __name__ == '__main__':
     3. if same exit, if not, continue
     4. modify bitrise.yml (update stack value)
     '''
-
-    largest_semver = default_stack().split(pattern)[1]
-    tmp_file = 'tmp.yml'
-
-    with open(BITRISE_YML, 'r') as infile:
-
-        obj_yaml = YAML()
-
-        # prevents re-formatting of yml file
-        obj_yaml.preserve_quotes = True
-        obj_yaml.width = 4096
-
-        y = obj_yaml.load(infile)
-
-        current_semver = y['workflows'][WORKFLOW]['meta']['bitrise.io']['stack']
-        
-        # remove pattern prefix from current_semver to compare with largest
-        current_semver = current_semver.split(pattern)[1]
-
-        if current_semver == largest_semver:
-            print('Xcode version unchanged! aborting.')
-        else:
-            print('New Xcode version available: {0} ... updating bitrise.yml!'.format(largest_semver))
-            # add prefix pattern back to be recognizable by bitrise
-            # as a valid stack value
-            y['workflows'][WORKFLOW]['meta']['bitrise.io']['stack'] = '{0}{1}'.format(pattern, largest_semver)
-            with open(tmp_file, 'w+') as tmpfile:
-                obj_yaml.dump(y, tmpfile)
-                copyfile(tmp_file, BITRISE_YML)
-                os.remove(tmp_file)
+    parser = argparse.ArgumentParser(description='Updates the stack of the {0} workflow to the default Bitrise Xcode stack.'.format(WORKFLOW))
+    parser.add_argument('--stack-info', help='read the stack info from this JSON file instead of the Bitrise API')
+    args = parser.parse_args()
+
+    if args.stack_info:
+        # offline mode, e.g. to test the update against a saved response
+        with open(args.stack_info, 'rb') as f:
+            new_yml = update_stack(f.read(), read_file(BITRISE_YML))
+        if new_yml is not None:
+            atomic_write(BITRISE_YML, new_yml.encode('utf-8'))
+        sys.exit(0)
+
+    # The stack info is large, VENDORED_SYNC_CACHE lets unchanged responses come back as a 304
+    source = Source('Bitrise stack info', BITRISE_STACK_INFO, BITRISE_YML, transform=update_stack)
+    try:
+        sync([source], cache=ConditionalCache.from_env())
+    except SyncError as err:
+        print(err)
+        sys.exit(1)